@@ -0,0 +1,392 @@
+"""In-process Meilisearch stand-in for benchmarks.
+
+`FakeMeili` is an httpx transport that answers the calls `AsyncMeiliClient`
+makes (`/indexes/{uid}/search`, `/multi-search`, `/indexes/{uid}/facet-search`,
+`GET /indexes/{uid}` and `/indexes/{uid}/documents`) from a
+list of documents held in memory, after an artificial network latency. Hits,
+filters (`=`, `!=`, `<`, `<=`, `>`, `>=`, `IN`, `TO`, `EXISTS`, `AND`, `OR`,
+`NOT`, parentheses), sort, facet distributions and facet stats behave like
+Meilisearch closely enough to exercise the backend's code paths; ranking is
+not modelled, matches keep the document order.
+
+`load_documents()` builds the documents from the scraper snapshots in
+`data/raw/` the way `run_reindex.py` indexes them, with the dates moved
+forward so the events are upcoming relative to today.
+
+Evaluating a query is slow in Python, so the encoded responses are memoized
+per request body; the CPU time still spent inside the fake is summed in
+`cpu_seconds`, so a benchmark can subtract it from its own measurement.
+"""
+import asyncio
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO = os.path.join(HERE, "..", "..", "..")
+DATA_DIR = os.path.join(REPO, "data", "raw")
+sys.path.insert(0, os.path.join(REPO, "services", "scraper", "scripts"))
+
+import run_reindex  # noqa: E402
+import snapshots  # noqa: E402
+
+SEARCHABLE = ("band", "location")
+
+
+def load_documents(data_dir: str = DATA_DIR, copies: int = 1, today: Optional[date] = None) -> List[Dict[str, Any]]:
+    """Index documents from the latest snapshot of every source under `data_dir`.
+
+    Dates are shifted by whole weeks (weekdays stay the same) so the earliest
+    event falls on or after `today`. Each further copy is moved another 52
+    weeks ahead, which gives larger hit sets with the same distribution.
+    """
+    events = []
+    found = glob.glob(os.path.join(data_dir, "**", "concert_events_*"), recursive=True)
+    for directory in sorted({os.path.dirname(p) for p in found}):
+        latest = snapshots.find_latest(directory=directory)
+        if latest:
+            events.extend(snapshots.iter_snapshot(latest))
+    if not events:
+        raise FileNotFoundError(f"No snapshots under {data_dir}")
+
+    today = today or date.today()
+    first = min(datetime.fromisoformat(e["date"]).date() for e in events)
+    weeks = max(0, -(-(today - first).days // 7))
+    shifted = []
+    for copy in range(copies):
+        delta = timedelta(weeks=weeks + 52 * copy)
+        for e in events:
+            shifted.append({**e, "date": (datetime.fromisoformat(e["date"]) + delta).isoformat()})
+    return list(run_reindex.prepare_docs(shifted))
+
+
+# filter expressions
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<punct>[()\[\],])
+  | (?P<op>>=|<=|!=|=|<|>)
+  | "(?P<dq>(?:[^"\\]|\\.)*)"
+  | '(?P<sq>(?:[^'\\]|\\.)*)'
+  | (?P<word>[^\s()\[\],=<>!]+)
+)""", re.VERBOSE)
+_KEYWORDS = {"AND", "OR", "NOT", "IN", "TO", "EXISTS"}
+
+
+def _tokenize(expr: str) -> List[tuple]:
+    tokens, pos = [], 0
+    expr = expr.strip()
+    while pos < len(expr):
+        m = _TOKEN.match(expr, pos)
+        if not m or m.end() == pos:
+            raise ValueError(f"invalid filter at {pos}: {expr!r}")
+        pos = m.end()
+        if m.group("punct"):
+            tokens.append(("punct", m.group("punct")))
+        elif m.group("op"):
+            tokens.append(("op", m.group("op")))
+        elif m.group("dq") is not None or m.group("sq") is not None:
+            tokens.append(("value", m.group("dq") if m.group("dq") is not None else m.group("sq")))
+        elif m.group("word").upper() in _KEYWORDS:
+            tokens.append(("kw", m.group("word").upper()))
+        else:
+            tokens.append(("value", m.group("word")))
+    return tokens
+
+
+def _number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _values(doc: Dict[str, Any], field: str) -> list:
+    value = doc.get(field)
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
+
+
+def _equals(value: Any, literal: str) -> bool:
+    number = _number(literal)
+    if number is not None and _number(value) is not None:
+        return _number(value) == number
+    return str(value).lower() == literal.lower()
+
+
+def _compare(field: str, op: str, literal: str) -> Callable[[dict], bool]:
+    if op == "=":
+        return lambda d: any(_equals(v, literal) for v in _values(d, field))
+    if op == "!=":
+        return lambda d: not any(_equals(v, literal) for v in _values(d, field))
+    bound = _number(literal)
+    if bound is None:
+        raise ValueError(f"{field} {op} needs a number, got {literal!r}")
+    test = {"<": float.__lt__, "<=": float.__le__, ">": float.__gt__, ">=": float.__ge__}[op]
+    return lambda d: any((n := _number(v)) is not None and test(n, bound) for v in _values(d, field))
+
+
+class _Parser:
+    def __init__(self, tokens: List[tuple]) -> None:
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[tuple]:
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+    def take(self, kind: str, text: Optional[str] = None) -> str:
+        token = self.peek()
+        if token is None or token[0] != kind or (text is not None and token[1] != text):
+            raise ValueError(f"expected {text or kind} at token {self.pos}, got {token}")
+        self.pos += 1
+        return token[1]
+
+    def accept(self, kind: str, text: str) -> bool:
+        if self.peek() == (kind, text):
+            self.pos += 1
+            return True
+        return False
+
+    def parse(self) -> Callable[[dict], bool]:
+        pred = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"unexpected {self.peek()}")
+        return pred
+
+    def parse_or(self):
+        preds = [self.parse_and()]
+        while self.accept("kw", "OR"):
+            preds.append(self.parse_and())
+        return preds[0] if len(preds) == 1 else (lambda d: any(p(d) for p in preds))
+
+    def parse_and(self):
+        preds = [self.parse_not()]
+        while self.accept("kw", "AND"):
+            preds.append(self.parse_not())
+        return preds[0] if len(preds) == 1 else (lambda d: all(p(d) for p in preds))
+
+    def parse_not(self):
+        if self.accept("kw", "NOT"):
+            pred = self.parse_not()
+            return lambda d: not pred(d)
+        return self.parse_primary()
+
+    def parse_primary(self):
+        if self.accept("punct", "("):
+            pred = self.parse_or()
+            self.take("punct", ")")
+            return pred
+        field = self.take("value")
+        if self.accept("kw", "EXISTS"):
+            return lambda d: d.get(field) is not None
+        if self.accept("kw", "NOT"):
+            if self.accept("kw", "EXISTS"):
+                return lambda d: d.get(field) is None
+            pred = self.parse_in(field)
+            return lambda d: not pred(d)
+        if self.peek() == ("kw", "IN"):
+            return self.parse_in(field)
+        if self.peek() and self.peek()[0] == "op":
+            return _compare(field, self.take("op"), self.take("value"))
+        low = _number(self.take("value"))
+        self.take("kw", "TO")
+        high = _number(self.take("value"))
+        return lambda d: any((n := _number(v)) is not None and low <= n <= high for v in _values(d, field))
+
+    def parse_in(self, field: str):
+        self.take("kw", "IN")
+        self.take("punct", "[")
+        literals = []
+        while not self.accept("punct", "]"):
+            literals.append(self.take("value"))
+            self.accept("punct", ",")
+        return lambda d: any(_equals(v, lit) for v in _values(d, field) for lit in literals)
+
+
+@lru_cache(maxsize=1024)
+def compile_filter(expr: str) -> Callable[[dict], bool]:
+    return _Parser(_tokenize(expr)).parse()
+
+
+def _filter_predicate(flt: Any) -> Optional[Callable[[dict], bool]]:
+    """Meilisearch accepts a string or an array (AND) of strings/arrays (OR)."""
+    if not flt:
+        return None
+    if isinstance(flt, str):
+        return compile_filter(flt)
+    preds = [_filter_predicate(f) if isinstance(f, str) else _any_of(f) for f in flt]
+    return lambda d: all(p(d) for p in preds)
+
+
+def _any_of(flts: Iterable[str]) -> Callable[[dict], bool]:
+    preds = [compile_filter(f) for f in flts]
+    return lambda d: any(p(d) for p in preds)
+
+
+# search
+
+def _facet_key(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _sort_key(field: str):
+    def key(d):
+        v = d.get(field)
+        # missing values sort last in both directions, as in Meilisearch
+        return (v is None, v if v is not None else 0)
+    return key
+
+
+class FakeMeili(httpx.AsyncBaseTransport):
+    def __init__(
+        self,
+        documents: List[Dict[str, Any]],
+        index_name: str = "events",
+        latency: float = 0.002,
+        jitter: float = 0.001,
+        seed: int = 0,
+        memo_size: int = 20000,
+    ) -> None:
+        self.index_name = index_name
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.version = datetime.now().isoformat()
+        self.requests = 0
+        self.cpu_seconds = 0.0
+        self.memo_size = memo_size
+        self.set_documents(documents)
+
+    def set_documents(self, documents: List[Dict[str, Any]]) -> None:
+        self.documents = documents
+        self._words = [
+            " ".join(str(d.get(f) or "") for f in SEARCHABLE).lower().split()
+            for d in documents
+        ]
+        self.version = datetime.now().isoformat()
+        self._memo: Dict[tuple, tuple] = {}
+
+    def search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        terms = str(body.get("q") or "").lower().split()
+        pred = _filter_predicate(body.get("filter"))
+        matches = [
+            d for d, words in zip(self.documents, self._words)
+            if (not terms or all(any(w.startswith(t) for w in words) for t in terms))
+            and (pred is None or pred(d))
+        ]
+        for spec in reversed(body.get("sort") or []):
+            field, _, direction = spec.partition(":")
+            present = [d for d in matches if d.get(field) is not None]
+            missing = [d for d in matches if d.get(field) is None]
+            present.sort(key=_sort_key(field), reverse=direction == "desc")
+            matches = present + missing
+
+        offset = int(body.get("offset") or 0)
+        limit = int(body.get("limit", 20))
+        hits = matches[offset:offset + limit]
+        attrs = body.get("attributesToRetrieve")
+        if attrs and "*" not in attrs:
+            hits = [{k: d[k] for k in attrs if k in d} for d in hits]
+
+        res = {
+            "hits": hits,
+            "query": body.get("q") or "",
+            "processingTimeMs": 0,
+            "limit": limit,
+            "offset": offset,
+            "estimatedTotalHits": len(matches),
+        }
+        facets = body.get("facets")
+        if facets:
+            distribution: Dict[str, Dict[str, int]] = {f: {} for f in facets}
+            stats: Dict[str, Dict[str, float]] = {}
+            for d in matches:
+                for f in facets:
+                    for v in _values(d, f):
+                        k = _facet_key(v)
+                        distribution[f][k] = distribution[f].get(k, 0) + 1
+                        n = _number(v) if not isinstance(v, str) else None
+                        if n is not None:
+                            s = stats.setdefault(f, {"min": n, "max": n})
+                            s["min"], s["max"] = min(s["min"], n), max(s["max"], n)
+            res["facetDistribution"] = distribution
+            res["facetStats"] = stats
+        return res
+
+    def facet_search(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Values of `facetName` with a word starting with `facetQuery`, at most 100."""
+        name = body["facetName"]
+        query = str(body.get("facetQuery") or "").lower()
+        res = self.search({"q": body.get("q"), "filter": body.get("filter"), "facets": [name], "limit": 0})
+        hits = [
+            {"value": value, "count": count}
+            for value, count in res["facetDistribution"][name].items()
+            if not query or any(w.startswith(query) for w in value.lower().split())
+        ]
+        hits.sort(key=lambda h: h["value"])
+        return {"facetHits": hits[:100], "facetQuery": body.get("facetQuery"), "processingTimeMs": 0}
+
+    def documents_page(self, params: Dict[str, str]) -> Dict[str, Any]:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 20))
+        page = self.documents[offset:offset + limit]
+        if params.get("fields") and params["fields"] != "*":
+            fields = params["fields"].split(",")
+            page = [{k: d[k] for k in fields if k in d} for d in page]
+        return {"results": page, "offset": offset, "limit": limit, "total": len(self.documents)}
+
+    def route(self, method: str, path: str, body: Dict[str, Any], params: Optional[Dict[str, str]] = None) -> tuple:
+        index_path = f"/indexes/{self.index_name}"
+        if method == "GET" and path == index_path:
+            return 200, {"uid": self.index_name, "primaryKey": "id", "createdAt": self.version,
+                         "updatedAt": self.version}
+        if method == "GET" and path == f"{index_path}/documents":
+            return 200, self.documents_page(params or {})
+        if method == "GET" and path == "/health":
+            return 200, {"status": "available"}
+        if method == "POST" and path == f"{index_path}/search":
+            return 200, self.search(body)
+        if method == "POST" and path == f"{index_path}/facet-search":
+            return 200, self.facet_search(body)
+        if method == "POST" and path == "/multi-search":
+            return 200, {"results": [{"indexUid": q.get("indexUid"), **self.search(q)} for q in body["queries"]]}
+        return 404, {"message": f"{method} {path} is not supported by the fake", "code": "not_found"}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        started = time.thread_time()
+        key = (request.method, str(request.url), request.content)
+        response = self._memo.get(key)
+        if response is None:
+            body = json.loads(request.content) if request.content else {}
+            try:
+                status, payload = self.route(request.method, request.url.path, body, dict(request.url.params))
+            except ValueError as e:
+                status, payload = 400, {"message": str(e), "code": "invalid_search_filter"}
+            response = status, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            if len(self._memo) < self.memo_size:
+                self._memo[key] = response
+        status, content = response
+        self.cpu_seconds += time.thread_time() - started
+
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return httpx.Response(status, content=content, headers={"content-type": "application/json"})
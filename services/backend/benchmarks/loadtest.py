@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Load test for the backend's /search route without a live Meilisearch.
+
+Starts the app from `create_app()` with its Meilisearch client wired to the
+in-process `FakeMeili` (see `fake_meili.py`), which serves hits built from the
+snapshots in `data/raw/` after a configurable latency. Concurrent workers then
+drive a weighted mix of requests through the ASGI app:
+
+  text      free-text query (`q` = a band-name prefix)
+  filter    venue, price or status filter
+  sort      date or price sort, no query
+  weekday   `weekday=fri,sat`-style selections
+  facets    `limit=1000` with `facet_mode=hits` or `exact`, the facet-heavy calls
+  default   the frontend's initial "upcoming gigs" view, identical every time
+
+For every concurrency level it reports requests/s, p50/p95/p99 latency overall
+and per kind, and CPU time per request, both in total and without the time
+spent inside the fake. The client, the app and the fake share one process and
+event loop, so the numbers compare revisions of the route and client rather
+than predict production capacity. The response cache is off unless `--cache`.
+
+Usage examples:
+  python benchmarks/loadtest.py
+  python benchmarks/loadtest.py --concurrency 1 16 64 --requests 5000 --latency-ms 5
+  python benchmarks/loadtest.py --mix facets=1 --json facets.json
+  python benchmarks/loadtest.py --mix default=1 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "src"))
+# keep the sampled per-search log lines out of the report (read on import)
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+
+import fake_meili  # noqa: E402
+from api.main import create_app  # noqa: E402
+
+DEFAULT_MIX = "text=4,filter=3,sort=2,weekday=2,facets=1"
+WEEKDAY_SETS = ["fri", "sat", "fri,sat", "sat,sun", "mon,tue,wed,thu"]
+# the facets the frontend's facet panel shows
+PANEL_FACETS = "location,band,status_kind,weekday"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(","):
+        kind, _, weight = part.partition("=")
+        kind = kind.strip()
+        if kind not in QUERIES:
+            raise SystemExit(f"unknown query kind {kind!r}, choose from {', '.join(QUERIES)}")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+class QueryMix:
+    """Random /search parameters drawn from the values in the documents."""
+
+    def __init__(self, documents: List[dict], seed: int = 0) -> None:
+        self.random = random.Random(seed)
+        words = {w.lower() for d in documents for w in str(d.get("band") or "").split() if len(w) >= 3}
+        self.prefixes = sorted({w[:n] for w in words for n in (3, 5) if w[:n].isalpha()})
+        self.locations = sorted({d["location"] for d in documents if d.get("location")})
+        self.statuses = sorted({d["status_kind"] for d in documents if d.get("status_kind")})
+
+    def text(self) -> dict:
+        return {"q": self.random.choice(self.prefixes)}
+
+    def filter(self) -> dict:
+        r = self.random
+        flt = r.choice([
+            lambda: f'location = "{r.choice(self.locations)}"',
+            lambda: f"price_eur < {r.choice([15, 20, 25, 30, 40])}",
+            lambda: f'status_kind = "{r.choice(self.statuses)}"',
+            lambda: f'location = "{r.choice(self.locations)}" AND price_eur < 30',
+        ])()
+        return {"filter": flt, "limit": r.choice([20, 50, 100])}
+
+    def sort(self) -> dict:
+        return {"sort": self.random.choice(["date:asc", "date:desc", "price_eur:asc", "price_eur:desc"])}
+
+    def weekday(self) -> dict:
+        params = {"weekday": self.random.choice(WEEKDAY_SETS)}
+        if self.random.random() < 0.5:
+            params["q"] = self.random.choice(self.prefixes)
+        return params
+
+    def facets(self) -> dict:
+        params = {"limit": 1000, "facet_mode": self.random.choice(["hits", "exact"]), "facets": PANEL_FACETS}
+        if self.random.random() < 0.5:
+            params["weekday"] = self.random.choice(WEEKDAY_SETS)
+        return params
+
+    def default(self) -> dict:
+        return {"q": "", "limit": 1000, "facets": PANEL_FACETS}
+
+
+QUERIES = ("text", "filter", "sort", "weekday", "facets", "default")
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def latency_stats(seconds: List[float]) -> dict:
+    values = sorted(seconds)
+    return {
+        "requests": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+    }
+
+
+async def run_level(app, client, fake, mix, weights, concurrency, n_requests):
+    kinds = mix.random.choices(list(weights), weights=list(weights.values()), k=n_requests)
+    plan = [(kind, getattr(mix, kind)()) for kind in kinds]
+    samples: Dict[str, List[float]] = {kind: [] for kind in weights}
+    errors: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < len(plan):
+            kind, params = plan[next_index]
+            next_index += 1
+            started = time.perf_counter()
+            r = await client.get("/search", params=params)
+            samples[kind].append(time.perf_counter() - started)
+            if r.status_code != 200:
+                errors[f"{kind}:{r.status_code}"] = errors.get(f"{kind}:{r.status_code}", 0) + 1
+
+    fake_cpu, fake_calls = fake.cpu_seconds, fake.requests
+    coalesced = app.state.search_cache.inflight.coalesced
+    cpu, wall = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    fake_cpu = fake.cpu_seconds - fake_cpu
+
+    return {
+        "concurrency": concurrency,
+        "seconds": round(wall, 3),
+        "rps": round(n_requests / wall, 1),
+        "cpu_ms_per_request": round(cpu / n_requests * 1000, 3),
+        "app_cpu_ms_per_request": round((cpu - fake_cpu) / n_requests * 1000, 3),
+        "meili_calls_per_request": round((fake.requests - fake_calls) / n_requests, 2),
+        "coalesced": app.state.search_cache.inflight.coalesced - coalesced,
+        "errors": errors,
+        "all": latency_stats([s for values in samples.values() for s in values]),
+        "kinds": {kind: latency_stats(values) for kind, values in samples.items() if values},
+    }
+
+
+def print_level(level):
+    print(f"\nconcurrency {level['concurrency']}: {level['rps']:,} req/s, "
+          f"CPU {level['cpu_ms_per_request']:.3f} ms/req ({level['app_cpu_ms_per_request']:.3f} without the fake), "
+          f"{level['meili_calls_per_request']} Meilisearch calls/req, {level['coalesced']:,} coalesced")
+    for name, s in [("all", level["all"]), *level["kinds"].items()]:
+        print(f"  {name:<8} {s['requests']:>7,} req  p50 {s['p50_ms']:>8.2f} ms  p95 {s['p95_ms']:>8.2f} ms  "
+              f"p99 {s['p99_ms']:>8.2f} ms  max {s['max_ms']:>8.2f} ms")
+    for key, n in sorted(level["errors"].items()):
+        print(f"  ERROR {key}: {n}")
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, documents, weights):
+    fake = fake_meili.FakeMeili(documents, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                                seed=args.seed)
+    app = create_app(meili_transport=fake)
+    levels = []
+    async with app.router.lifespan_context(app):
+        if not args.cache:
+            # entries are evicted as soon as they are stored
+            app.state.search_cache.maxsize = 0
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            mix = QueryMix(documents, seed=args.seed)
+            if args.warmup:
+                await run_level(app, client, fake, mix, weights, max(args.concurrency), args.warmup)
+            for concurrency in args.concurrency:
+                level = await run_level(app, client, fake, mix, weights, concurrency, args.requests)
+                print_level(level)
+                levels.append(level)
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--data", default=fake_meili.DATA_DIR, help="Directory with scraper snapshots")
+    parser.add_argument("--copies", type=int, default=4,
+                        help="Copies of the snapshot events, each a year later (default: 4)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32],
+                        help="Concurrent clients, one run per value")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=200, help="Unmeasured requests before the first level")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Fake Meilisearch latency per call")
+    parser.add_argument("--jitter-ms", type=float, default=1.0, help="Random extra latency, up to this much")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted query kinds (default: {DEFAULT_MIX})")
+    parser.add_argument("--cache", action="store_true", help="Keep the /search response cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    documents = fake_meili.load_documents(args.data, copies=args.copies)
+    print(f"{len(documents):,} documents, latency {args.latency_ms} ms + up to {args.jitter_ms} ms, "
+          f"mix {args.mix}, cache {'on' if args.cache else 'off'}")
+
+    levels = asyncio.run(run(args, documents, weights))
+
+    if args.json:
+        results = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "git_revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "documents": len(documents),
+                "latency_ms": args.latency_ms,
+                "jitter_ms": args.jitter_ms,
+                "mix": weights,
+                "cache": args.cache,
+                "requests": args.requests,
+            },
+            "levels": levels,
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nWrote {args.json}")
+    if any(level["errors"] for level in levels):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,71 @@
-from fastapi import FastAPI
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import search
+from .routes import events, facets, metrics, search, suggest
+from .services.cache import SearchCache
+from .services.history import HistoryStore
+from .services.meili import AsyncMeiliClient
+from .services.metrics import Metrics
+from .services.suggest import SuggestIndex
 import os
 
+logger = logging.getLogger(__name__)
+
+
+def create_app(meili_transport=None):
+    """Build the app. `meili_transport` (an httpx transport) replaces the
+    network connection to Meilisearch, e.g. with an in-process fake."""
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # httpx logs every Meilisearch round-trip at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # one pooled Meilisearch client for the lifetime of the app
+        app.state.meili = AsyncMeiliClient(transport=meili_transport, metrics=app.state.metrics)
+        app.state.search_cache = SearchCache(app.state.meili)
+        app.state.metrics.add_collector(app.state.search_cache.metric_lines)
+        app.state.facet_cache = SearchCache(
+            app.state.meili,
+            maxsize=int(os.getenv("FACET_CACHE_SIZE", "256")),
+            ttl=float(os.getenv("FACET_CACHE_TTL", "300")),
+            name="facet",
+        )
+        app.state.metrics.add_collector(app.state.facet_cache.metric_lines)
+        app.state.suggest_index = SuggestIndex(app.state.meili)
+        try:
+            await app.state.suggest_index.rebuild(await app.state.search_cache.check_version())
+        except Exception as e:
+            # start anyway; /suggest retries the build
+            logger.warning("Could not build the suggest index: %s", e)
+        try:
+            yield
+        finally:
+            await app.state.meili.aclose()
+
+    app = FastAPI(title="gigfusion-backend", lifespan=lifespan)
+    app.state.metrics = Metrics()
+    # written by the scraper next to its snapshots; see services/scraper/scripts/history.py
+    app.state.history = HistoryStore(os.getenv("HISTORY_DB"))
 
-def create_app():
-    app = FastAPI(title="gigfusion-backend")
+    @app.middleware("http")
+    async def record_latency(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        # route template, not the raw path, to keep the label set small
+        route = request.scope.get("route")
+        labels = {"route": getattr(route, "path", "unmatched"), "method": request.method,
+                  "status": str(response.status_code)}
+        app.state.metrics.http_seconds.observe(time.perf_counter() - started, **labels)
+        # every route returns a complete body, so Content-Length is its size
+        length = response.headers.get("content-length")
+        if length is not None:
+            app.state.metrics.http_bytes.observe(int(length), **labels)
+        return response
 
     # Load CORS settings from environment variables
     origins = os.getenv("CORS_ALLOW_ORIGINS", "*")
@@ -32,6 +92,10 @@ def create_app():
     )
 
     app.include_router(search.router)
+    app.include_router(suggest.router)
+    app.include_router(facets.router)
+    app.include_router(events.router)
+    app.include_router(metrics.router)
     return app
 
 
@@ -0,0 +1,31 @@
+import logging
+import sqlite3
+
+from fastapi import APIRouter, Depends, HTTPException, Path
+
+from ..services.history import HistoryStore, get_history_store
+from ..services.responses import FastJSONResponse
+
+router = APIRouter(prefix="/events")
+
+logger = logging.getLogger(__name__)
+
+
+@router.get("/{event_id}/history")
+def event_history(
+    event_id: str = Path(..., min_length=1, max_length=64),
+    store: HistoryStore = Depends(get_history_store),
+):
+    """Every version of one event across the scraper's snapshots: price,
+    status and venue with the time range each was valid."""
+    if not store.available:
+        raise HTTPException(status_code=503, detail="Event history is not configured (HISTORY_DB)")
+    try:
+        history = store.event_history(event_id)
+    except sqlite3.Error as e:
+        # not (yet) a history database, or locked/corrupt
+        logger.warning("Reading event history from %s failed: %s", store.path, e)
+        raise HTTPException(status_code=503, detail="Event history is unavailable")
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"No history for event {event_id}")
+    return FastJSONResponse(history)
@@ -0,0 +1,92 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+
+from ..services.cache import SearchCache, get_facet_cache
+from ..services.meili import AsyncMeiliClient, get_meili
+from ..services.responses import FastJSONResponse
+from ..services.suggest import fold
+from .search import FACET_NAMES, MEILI_FACETS, build_filter
+
+# numeric facets have no facet search in Meilisearch
+NUMERIC_FACETS = ("price_eur",)
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
+class FacetValuesResponse(BaseModel):
+    name: str
+    query: str
+    values: List[FacetValue]
+    offset: int
+    limit: int
+    total: int
+
+
+router = APIRouter(prefix="/facets")
+
+
+async def facet_values(meili: AsyncMeiliClient, name: str, query: str, q: str, filter: str, sort: str) -> list:
+    """All values of facet `name` among the matching documents, sorted.
+
+    Without `query` this is the facet distribution (up to `maxValuesPerFacet`),
+    with it Meilisearch's facet search, which returns at most 100 values.
+    """
+    name = MEILI_FACETS.get(name, name)
+    if query:
+        values = await meili.facet_search(name, query, q, filter)
+    else:
+        res = await meili.search(q, {"filter": filter, "facets": [name], "limit": 0})
+        distribution = (res.get("facetDistribution") or {}).get(name, {})
+        values = [{"value": value, "count": count} for value, count in distribution.items()]
+    if sort == "alpha":
+        values.sort(key=lambda v: (fold(str(v["value"])), str(v["value"])))
+    else:
+        values.sort(key=lambda v: (-v["count"], fold(str(v["value"]))))
+    return [{"value": str(v["value"]), "count": v["count"]} for v in values]
+
+
+@router.get("/{name}", response_model=FacetValuesResponse)
+async def get_facet_values(
+    name: str,
+    query: str = Query("", max_length=100, description="Only values matching this (Meilisearch facet search)"),
+    q: str = Query("", description="Search query the counts are restricted to"),
+    filter: Optional[str] = Query(None, description="Filter the counts are restricted to"),
+    weekday: Optional[str] = Query(None, description="Optional comma-separated weekdays (mon,tue,...)"),
+    sort: str = Query("count", pattern="^(count|alpha)$", description="'count' (most frequent first) or 'alpha'"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=200),
+    meili: AsyncMeiliClient = Depends(get_meili),
+    cache: SearchCache = Depends(get_facet_cache),
+):
+    """One page of a facet's values, loaded when the facet panel opens or pages.
+
+    Counts cover the upcoming events matching `q` and `filter`. For
+    disjunctive counts, leave the facet's own selection out of `filter`; the
+    weekday selection is ignored for the weekday facet itself. The sorted
+    value list is cached, so paging through it costs no Meilisearch call.
+    """
+    if name not in FACET_NAMES:
+        raise HTTPException(status_code=404, detail=f"Unknown facet: {name}")
+    if query and name in NUMERIC_FACETS:
+        raise HTTPException(status_code=422, detail=f"Facet {name} is numeric and cannot be searched")
+    today = datetime.now(timezone.utc).date()
+    flt = build_filter(filter, None if name == "weekday" else weekday, today)
+    query = " ".join(query.split())
+
+    await cache.check_version()
+    key = (name, query.lower(), " ".join(q.lower().split()), flt, sort)
+    values, _ = await cache.get_or_compute(key, lambda: facet_values(meili, name, query, q, flt, sort))
+    return FastJSONResponse({
+        "name": name,
+        "query": query,
+        "values": values[offset:offset + limit],
+        "offset": offset,
+        "limit": limit,
+        "total": len(values),
+    })
@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from ..services.metrics import Metrics, get_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics(metrics: Metrics = Depends(get_metrics)):
+    """Prometheus text exposition of the app's metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
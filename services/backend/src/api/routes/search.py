@@ -1,10 +1,16 @@
+import json
+import logging
+from time import perf_counter
 from typing import List, Optional, Dict
-from datetime import datetime, timezone
+from datetime import date, datetime, time, timezone
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
 
-from ..services.meili import MeiliClient
+from ..services.cache import SearchCache, get_search_cache
+from ..services.meili import AsyncMeiliClient, get_meili
+from ..services.metrics import Metrics, SampledLogger, get_metrics
+from ..services.responses import FastJSONResponse
 
 
 class SearchRequest(BaseModel):
@@ -12,7 +18,10 @@ class SearchRequest(BaseModel):
     filter: Optional[str] = Field(None, description="Filter string for Meilisearch")
     facets: Optional[List[str]] = Field(None, description="Facet fields to return")
     sort: Optional[List[str]] = Field(None, description="Sort order, e.g. ['date:desc']")
-    limit: int = Field(default=100, description="Limit number of results", ge=1, le=1000)
+    limit: int = Field(default=100, description="Limit number of results; 0 for facet counts only", ge=0, le=1000)
+    offset: int = Field(default=0, description="Number of hits to skip", ge=0)
+    weekday: Optional[str] = Field(None, description="Optional comma-separated weekdays to filter (mon,tue,...)")
+    fields: Optional[List[str]] = Field(None, description="Hit fields to return; default LIST_FIELDS, ['*'] for all")
 
 
 class SearchResponse(BaseModel):
@@ -21,82 +30,242 @@ class SearchResponse(BaseModel):
     limit: int
     estimated_total_hits: int
     facets: Optional[dict] = None
+    facet_stats: Optional[dict] = None
+
+
+# one UI interaction: results plus a few differently filtered facet counts
+MAX_BATCH = 20
+
+
+class BatchRequest(BaseModel):
+    queries: List[SearchRequest] = Field(..., min_length=1, max_length=MAX_BATCH)
+
+
+class BatchResponse(BaseModel):
+    results: List[SearchResponse]
 
 
 router = APIRouter(prefix="/search")
 
+logger = logging.getLogger(__name__)
+sampled_log = SampledLogger(logger)
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+# Default facets from ingest.ipynb
+FACETS = ["location", "status_kind", "price_eur", "date", "band"]
+# what `facets=` may name; nothing is counted unless asked for
+FACET_NAMES = FACETS + ["weekday"]
+# `date` is counted per day in every mode: Meilisearch facets on the indexed
+# `day` (YYYY-MM-DD), the hits mode on the date part of each hit's `date`
+MEILI_FACETS = {"date": "day"}
+# sortableAttributes of the index (run_reindex.INDEX_SETTINGS)
+SORTABLE = ["date", "date_ts", "price_eur"]
+# hit fields the list view renders; `fields=*` returns whole documents
+LIST_FIELDS = ["id", "date", "weekday", "band", "location", "price_eur", "status_kind", "status_raw", "new_location"]
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Requested hit fields, or None for whole documents (`*`)."""
+    wanted = [f.strip() for f in (fields or "").split(",") if f.strip()]
+    if not wanted:
+        return list(LIST_FIELDS)
+    if "*" in wanted:
+        return None
+    return list(dict.fromkeys(wanted))
+
+
+def parse_facets(facets: Optional[str]) -> List[str]:
+    """Requested facet names in FACET_NAMES order; 422 for unknown ones."""
+    wanted = {f.strip() for f in (facets or "").split(",") if f.strip()}
+    unknown = wanted - set(FACET_NAMES)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown facets: {', '.join(sorted(unknown))}")
+    return [f for f in FACET_NAMES if f in wanted]
+
+
+def parse_sort(sort: Optional[str]) -> Optional[List[str]]:
+    """`field:asc|desc` sort rules; 422 for fields the index cannot sort by."""
+    rules = [s.strip() for s in (sort or "").split(",") if s.strip()]
+    for rule in rules:
+        field, _, direction = rule.partition(":")
+        if field not in SORTABLE or direction not in ("asc", "desc"):
+            raise HTTPException(status_code=422,
+                                detail=f"Invalid sort {rule!r}, expected <{'|'.join(SORTABLE)}>:<asc|desc>")
+    return rules or None
+
+
+def to_meili_facets(facets: List[str]) -> List[str]:
+    return [MEILI_FACETS.get(f, f) for f in facets]
+
+
+def from_meili_facets(distribution: Optional[dict]) -> Optional[dict]:
+    """Rename Meilisearch's facet keys back to the names the caller asked for."""
+    if not distribution:
+        return distribution
+    names = {v: k for k, v in MEILI_FACETS.items()}
+    return {names.get(k, k): v for k, v in distribution.items()}
+
+
+def build_filter(filter: Optional[str], weekday: Optional[str], today: date) -> str:
+    """Combine the caller's filter with the "upcoming only" rule and the weekday
+    selection into one Meilisearch filter over the fields derived at ingest
+    (`date_ts`, `weekday`, see run_reindex.add_date_fields).
+    """
+    today_ts = int(datetime.combine(today, time.min, tzinfo=timezone.utc).timestamp())
+    parts = [f"date_ts >= {today_ts}"]
+    if filter:
+        parts.insert(0, f"({filter})")
+    if weekday:
+        wanted = [w for w in WEEKDAYS if w in {x.strip().lower() for x in weekday.split(",")}]
+        if wanted:
+            parts.append(f"weekday IN [{', '.join(wanted)}]")
+    return " AND ".join(parts)
+
+
+def cache_key(
+    q: str,
+    filter: Optional[str],
+    sort: Optional[str],
+    limit: int,
+    weekday: Optional[str],
+    today: str,
+    facet_mode: str = "hits",
+    fields: Optional[List[str]] = None,
+    facets: Optional[List[str]] = None,
+) -> tuple:
+    """Normalize search parameters so equivalent requests share a cache entry."""
+    return (
+        " ".join((q or "").lower().split()),
+        " ".join((filter or "").split()),
+        ",".join(s.strip() for s in (sort or "").split(",") if s.strip()),
+        limit,
+        ",".join(sorted({w.strip().lower() for w in (weekday or "").split(",") if w.strip()})),
+        today,
+        facet_mode,
+        ",".join(sorted(fields)) if fields is not None else "*",
+        ",".join(facets or ()),
+    )
+
+
+async def search_exact_facets(
+    meili: AsyncMeiliClient,
+    q: str,
+    opts: dict,
+    filter: Optional[str],
+    weekday: Optional[str],
+    today: date,
+    facets: List[str],
+) -> dict:
+    """Let Meilisearch count `facets` over the whole match set, independent of `limit`.
+
+    The weekday facet is disjunctive: with a weekday selection its counts come
+    from a second query (same multi-search call) that applies every filter
+    except the weekday one, so unselected days still show their counts.
+    """
+    others = to_meili_facets([f for f in facets if f != "weekday"])
+    if weekday and "weekday" in facets:
+        results = await meili.multi_search([
+            {"q": q, **opts, "facets": others},
+            {"q": q, "filter": build_filter(filter, None, today), "facets": ["weekday"], "limit": 0},
+        ])
+    else:
+        results = [await meili.search(q, {**opts, "facets": to_meili_facets(facets)})]
+    res = results[0]
+
+    distribution = {k: {} for k in facets}
+    distribution.update(from_meili_facets(res.get("facetDistribution")) or {})
+    if "weekday" in facets:
+        distribution["weekday"] = (results[-1].get("facetDistribution") or {}).get("weekday", {})
+    return {
+        "hits": res.get("hits", []),
+        "offset": res.get("offset", 0),
+        "limit": res.get("limit", opts["limit"]),
+        "estimated_total_hits": res.get("estimatedTotalHits", 0),
+        "facets": distribution,
+        "facet_stats": res.get("facetStats") or {},
+    }
+
 
 @router.get("", response_model=SearchResponse)
-def search(
+async def search(
     q: str = Query(""),
     filter: Optional[str] = Query(None),
     sort: Optional[str] = Query(None),
     limit: int = Query(100, ge=1, le=1000),
-    weekday: Optional[str] = Query(None, description="Optional comma-separated weekdays to filter (mon,tue,...)")
+    weekday: Optional[str] = Query(None, description="Optional comma-separated weekdays to filter (mon,tue,...)"),
+    facet_mode: str = Query(
+        "hits",
+        pattern="^(hits|exact)$",
+        description="'hits' recomputes facets from the returned hits, 'exact' counts over all matches and adds facet_stats",
+    ),
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated hit fields; default is the list-view set (LIST_FIELDS), '*' returns whole documents",
+    ),
+    facets: Optional[str] = Query(
+        None,
+        description="Comma-separated facets to count (location,status_kind,price_eur,date,band,weekday); "
+                    "none by default, single facets page through /facets/{name}",
+    ),
+    meili: AsyncMeiliClient = Depends(get_meili),
+    cache: SearchCache = Depends(get_search_cache),
+    metrics: Metrics = Depends(get_metrics),
 ):
-    meili = MeiliClient()
-    # Default facets from ingest.ipynb
+    started = perf_counter()
+    sort = ",".join(parse_sort(sort) or []) or None
+    response, source = await _search(q, filter, sort, limit, weekday, facet_mode, parse_fields(fields),
+                                     parse_facets(facets), meili, cache, metrics)
+    metrics.search_seconds.observe(perf_counter() - started, facet_mode=facet_mode, cache=source)
+    if source == "miss":
+        metrics.hits.observe(len(response["hits"]), facet_mode=facet_mode)
+    # already shaped like SearchResponse; skip validating every hit
+    return FastJSONResponse(response)
+
 
-    opts = {"limit": limit,
-            "facets": ["location", "status_kind", "price_eur", "date", "band"]}
-    
+async def _search(q, filter, sort, limit, weekday, facet_mode, fields, facets, meili, cache, metrics):
+    """The /search handler proper; returns (response, source), where source
+    is "hit", "miss" or "coalesced" (see SearchCache.get_or_compute)."""
     # Get today's date in ISO format
     today = datetime.now(timezone.utc).date()
     today_str = today.isoformat()
-    if filter:
-        opts["filter"] = filter + f' AND date >= "{today_str}"'
-    else:
-        opts["filter"] = f'date >= "{today_str}"'
-    
+
+    await cache.check_version()
+    params_key = cache_key(q, filter, sort, limit, weekday, today_str, facet_mode, fields, facets)
+    return await cache.get_or_compute(
+        params_key, lambda: _query(q, filter, sort, limit, weekday, facet_mode, fields, facets, today, meili, metrics)
+    )
+
+
+async def _query(q, filter, sort, limit, weekday, facet_mode, fields, facets, today, meili, metrics):
+    """Ask Meilisearch and shape the response; runs once for identical concurrent requests."""
+    opts = {"limit": limit}
+    # hits mode recomputes facets from the hits, so it needs those fields too
+    needed = facets if facet_mode == "hits" else []
+    extra = [f for f in needed if fields is not None and f not in fields]
+    if fields is not None:
+        opts["attributesToRetrieve"] = fields + extra
+
+    opts["filter"] = build_filter(filter, weekday, today)
+
     if sort:
         opts["sort"] = sort.split(",")
 
-    print(f"Search Meilisearch: q={q!r}, opts={opts}")
+    sampled_log.info("Search Meilisearch: q=%r, opts=%s", q, opts)
 
-    res = meili.search(q or "", opts)
+    if facet_mode == "exact":
+        return await search_exact_facets(meili, q or "", opts, filter, weekday, today, facets)
 
-    # Build a weekday distribution from the returned hits (server-side)
-    hits = res.get("hits", [])
-    weekday_map: Dict[int, str] = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
+    res = await meili.search(q or "", opts)
+    post_started = perf_counter()
 
-    # Optionally filter hits by weekday(s) before computing final facets/hits
-    if weekday:
-        wanted = set([w.strip().lower() for w in weekday.split(',') if w.strip()])
-        filtered_hits = []
-        for h in hits:
-            d = None
-            try:
-                d = datetime.fromisoformat(str(h.get("date")))
-            except Exception:
-                try:
-                    d = datetime.strptime(str(h.get("date"))[:10], "%Y-%m-%d")
-                except Exception:
-                    d = None
-            if d is None:
-                continue
-            if weekday_map.get(d.weekday()) in wanted:
-                filtered_hits.append(h)
-        hits = filtered_hits
-    # Recompute weekday counts and other facet distributions from the (possibly filtered) hits
-    weekday_counts: Dict[str, int] = {}
-    # Prepare containers for facet counts we want to recompute when a weekday filter is applied
-    recompute_keys = ["location", "status_kind", "price_eur", "date", "band"]
+    # Weekday filtering already happened in Meilisearch via the indexed `weekday` field
+    hits = res.get("hits", [])
+    # Count the requested facets over the returned hits (Meilisearch is not asked for them)
+    recompute_keys = facets
     recomputed_facets: Dict[str, Dict[str, int]] = {k: {} for k in recompute_keys}
 
     for h in hits:
-        try:
-            d = datetime.fromisoformat(str(h.get("date")))
-        except Exception:
-            try:
-                d = datetime.strptime(str(h.get("date"))[:10], "%Y-%m-%d")
-            except Exception:
-                d = None
-        if d:
-            key = weekday_map.get(d.weekday(), "")
-            if key:
-                weekday_counts[key] = weekday_counts.get(key, 0) + 1
-
-        # Recompute other facets from the hit values
         for fk in recompute_keys:
             val = h.get(fk)
             if val is None:
@@ -112,12 +281,8 @@ def search(
                 sval = str(val)
             recomputed_facets[fk][sval] = recomputed_facets[fk].get(sval, 0) + 1
 
-    # Use the original facetDistribution as a base, but override with recomputed distributions
-    base_facets = res.get("facetDistribution") or {}
-    merged_facets = {**base_facets}
-    # Only override with recomputed data for keys we care about (so weekday selection affects them)
-    for k in recompute_keys:
-        merged_facets[k] = recomputed_facets.get(k, {})
+    if extra:
+        hits = [{k: h[k] for k in fields if k in h} for h in hits]
 
     # normalize response for the Pydantic model
     response = {
@@ -125,9 +290,74 @@ def search(
         "offset": res.get("offset", 0),
         "limit": res.get("limit", limit),
         "estimated_total_hits": res.get("estimatedTotalHits", 0),
-        "facets": {
-            **merged_facets,
-            "weekday": weekday_counts,
-        },
+        "facets": recomputed_facets,
     }
+    metrics.postprocess_seconds.observe(perf_counter() - post_started, facet_mode=facet_mode)
     return response
+
+
+def batch_query(req: SearchRequest, today: date) -> dict:
+    """Meilisearch query for one SearchRequest of a batch; same upcoming-only
+    and weekday rules as GET /search, facets only if asked for. Unknown
+    facets and sort rules raise 422 like they do there."""
+    query = {
+        "q": req.q or "",
+        "filter": build_filter(req.filter, req.weekday, today),
+        "limit": req.limit,
+        "offset": req.offset,
+    }
+    facets = parse_facets(",".join(req.facets or []))
+    if facets:
+        query["facets"] = to_meili_facets(facets)
+    sort = parse_sort(",".join(req.sort or []))
+    if sort:
+        query["sort"] = sort
+    fields = parse_fields(",".join(req.fields or []))
+    if fields is not None:
+        query["attributesToRetrieve"] = fields
+    return query
+
+
+def batch_result(res: dict) -> dict:
+    return {
+        "hits": res.get("hits", []),
+        "offset": res.get("offset", 0),
+        "limit": res.get("limit", 0),
+        "estimated_total_hits": res.get("estimatedTotalHits", 0),
+        "facets": from_meili_facets(res.get("facetDistribution")),
+        "facet_stats": res.get("facetStats"),
+    }
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def search_batch(
+    body: BatchRequest,
+    meili: AsyncMeiliClient = Depends(get_meili),
+    cache: SearchCache = Depends(get_search_cache),
+    metrics: Metrics = Depends(get_metrics),
+):
+    """Run several searches in one Meilisearch multi-search call.
+
+    Results come back in request order. A facet panel can send the result
+    query plus one `limit: 0` query per disjunctive facet (all filters except
+    that facet's own) and get everything in one round-trip.
+    """
+    started = perf_counter()
+    today = datetime.now(timezone.utc).date()
+    queries = [batch_query(req, today) for req in body.queries]
+
+    async def run():
+        results = await meili.multi_search(queries)
+        return {"results": [batch_result(res) for res in results]}
+
+    await cache.check_version()
+    key = ("batch", json.dumps(queries, sort_keys=True, ensure_ascii=False))
+    response, source = await cache.get_or_compute(key, run)
+    metrics.search_seconds.observe(perf_counter() - started, facet_mode="batch", cache=source)
+    return FastJSONResponse(response)
+
+
+@router.get("/cache")
+def cache_stats(cache: SearchCache = Depends(get_search_cache)):
+    """Hit/miss counters of the /search response cache."""
+    return cache.stats()
@@ -0,0 +1,46 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+
+from ..services.cache import SearchCache, get_search_cache
+from ..services.responses import FastJSONResponse
+from ..services.suggest import SUGGEST_FIELDS, SuggestIndex, get_suggest_index
+
+
+class Suggestion(BaseModel):
+    value: str
+    field: str
+    count: int
+
+
+class SuggestResponse(BaseModel):
+    prefix: str
+    suggestions: List[Suggestion]
+
+
+router = APIRouter(prefix="/suggest")
+
+
+@router.get("", response_model=SuggestResponse)
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of band,location,section"),
+    index: SuggestIndex = Depends(get_suggest_index),
+    cache: SearchCache = Depends(get_search_cache),
+):
+    """Band, venue and section completions for a search box, served from memory."""
+    wanted = [f.strip() for f in (fields or "").split(",") if f.strip()] or None
+    unknown = set(wanted or ()) - set(SUGGEST_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown suggest fields: {', '.join(sorted(unknown))}")
+    # the version is re-read from Meilisearch at most every few seconds
+    index.ensure_current(await cache.check_version())
+    return FastJSONResponse({"prefix": prefix, "suggestions": index.suggest(prefix, limit, wanted)})
+
+
+@router.get("/stats")
+def suggest_stats(index: SuggestIndex = Depends(get_suggest_index)):
+    """Size and version of the suggest index."""
+    return index.stats()
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from fastapi import Request
+
+from .meili import AsyncMeiliClient
+from .metrics import gauge_lines
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """In-memory LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 512, ttl: float = 60.0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into one.
+
+    While a call for ``key`` is in flight, further calls with the same key wait
+    for it and share its result (or exception) instead of starting their own.
+    Nothing is kept once it finishes, so a result is never older than the
+    request that waits for it. The shared call runs as its own task: a caller
+    that goes away does not cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self.coalesced = 0
+        self._calls: Dict[Hashable, "asyncio.Task"] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``(result, joined)``; ``joined`` is True if another call ran it."""
+        task = self._calls.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task), True
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda t: self._finished(key, t))
+        return await asyncio.shield(task), False
+
+    def _finished(self, key: Hashable, task: "asyncio.Task") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            task.exception()  # retrieved here in case every caller went away
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class SearchCache(TTLCache):
+    """Response cache for ``/search`` that is dropped whenever the index changes.
+
+    The index version is Meilisearch's ``updatedAt`` for the index, which moves
+    on every document or settings write done by ``run_reindex.py``. It is
+    re-read at most every ``version_interval`` seconds so a cache hit does not
+    cost a round-trip.
+
+    Misses go through ``inflight``, so identical requests arriving together
+    share one Meilisearch call and one post-processing pass.
+    """
+
+    def __init__(
+        self,
+        meili: AsyncMeiliClient,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        version_interval: Optional[float] = None,
+        name: str = "search",
+    ) -> None:
+        super().__init__(
+            maxsize=maxsize or int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+            ttl=ttl or float(os.getenv("SEARCH_CACHE_TTL", "60")),
+        )
+        self.meili = meili
+        self.name = name
+        self.version_interval = version_interval or float(os.getenv("SEARCH_CACHE_VERSION_INTERVAL", "5"))
+        self.version: Optional[str] = None
+        self.invalidations = 0
+        self.inflight = SingleFlight()
+        self._checked_at = 0.0
+
+    async def check_version(self) -> Optional[str]:
+        now = time.monotonic()
+        if now - self._checked_at < self.version_interval:
+            return self.version
+        self._checked_at = now
+        try:
+            version = await self.meili.get_index_version()
+        except Exception as e:
+            # keep serving from cache; the TTL still bounds staleness
+            logger.warning("Could not read index version: %s", e)
+            return self.version
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+        return version
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Tuple[Any, str]:
+        """Cached value for ``key``, computing and storing it on a miss.
+
+        Returns ``(value, source)`` with source ``hit``, ``miss`` (computed by
+        this call) or ``coalesced`` (computed by an identical concurrent call).
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, "hit"
+
+        version = self.version
+
+        async def compute_and_store():
+            value = await compute()
+            # an index change while this ran cleared the cache; storing the
+            # result would bring back data from before it
+            if self.version == version:
+                self.set(key, value)
+            return value
+
+        # the version is part of the key so requests made after an index
+        # change never join a call started before it
+        value, joined = await self.inflight.do((version, key), compute_and_store)
+        return value, "coalesced" if joined else "miss"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "version": self.version,
+            "invalidations": self.invalidations,
+            "coalesced": self.inflight.coalesced,
+            "inflight": len(self.inflight),
+        }
+
+    def metric_lines(self) -> List[str]:
+        """Cache counters for ``/metrics``, named after the cache."""
+        prefix, what = f"gigfusion_{self.name}", self.name.capitalize()
+        return [
+            *gauge_lines(f"{prefix}_cache_hits_total", f"{what} cache hits", self.hits, "counter"),
+            *gauge_lines(f"{prefix}_cache_misses_total", f"{what} cache misses", self.misses, "counter"),
+            *gauge_lines(f"{prefix}_cache_invalidations_total", f"{what} cache drops on index change",
+                         self.invalidations, "counter"),
+            *gauge_lines(f"{prefix}_cache_entries", f"Cached {self.name} responses", len(self._data)),
+            *gauge_lines(f"{prefix}_coalesced_total",
+                         f"{what} requests that shared an identical in-flight request", self.inflight.coalesced,
+                         "counter"),
+            *gauge_lines(f"{prefix}_inflight", f"Distinct {self.name} requests in flight", len(self.inflight)),
+        ]
+
+
+def get_search_cache(request: Request) -> SearchCache:
+    return request.app.state.search_cache
+
+
+def get_facet_cache(request: Request) -> SearchCache:
+    return request.app.state.facet_cache
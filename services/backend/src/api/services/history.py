@@ -0,0 +1,62 @@
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from fastapi import Request
+
+# columns of the scraper's `event_versions` table (services/scraper/scripts/history.py)
+VERSION_FIELDS = ("date", "band", "location", "price_eur", "status_kind", "status_raw", "new_location")
+# fields whose changes are listed separately
+CHANGE_FIELDS = ("price_eur", "status_kind", "new_location", "location", "date")
+
+
+class HistoryStore:
+    """Read-only access to the event history the scraper compacts its
+    snapshots into.
+
+    Every lookup opens its own read-only connection: that takes microseconds,
+    works from the threadpool FastAPI runs sync routes in, and holds no lock
+    the scraper would have to wait for between lookups. Errors reading the
+    file surface as `sqlite3.Error`.
+    """
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+
+    @property
+    def available(self) -> bool:
+        return bool(self.path) and os.path.exists(self.path)
+
+    def event_history(self, event_id: str) -> Optional[Dict[str, Any]]:
+        """Versions of one event, oldest first, plus the field changes between
+        them; None if the event is not in the history."""
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute(
+                f"SELECT valid_from, valid_to, {', '.join(VERSION_FIELDS)} FROM event_versions "
+                "WHERE event_id = ? ORDER BY valid_from",
+                (event_id,),
+            ).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return None
+        versions = [dict(zip(("valid_from", "valid_to") + VERSION_FIELDS, row)) for row in rows]
+        changes: List[Dict[str, Any]] = []
+        for before, after in zip(versions, versions[1:]):
+            for field in CHANGE_FIELDS:
+                if before[field] != after[field]:
+                    changes.append({"at": after["valid_from"], "field": field,
+                                    "from": before[field], "to": after[field]})
+        return {
+            "id": event_id,
+            "first_seen": versions[0]["valid_from"],
+            # set once the event dropped out of the snapshots
+            "gone_at": versions[-1]["valid_to"],
+            "versions": versions,
+            "changes": changes,
+        }
+
+
+def get_history_store(request: Request) -> HistoryStore:
+    return request.app.state.history
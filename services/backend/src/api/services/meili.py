@@ -1,7 +1,13 @@
 import os
-from typing import Any, Dict, Optional
+import time
+from typing import Any, Dict, List, Optional
 
+import httpx
 import meilisearch
+from fastapi import HTTPException, Request
+
+from .metrics import Metrics
+from .responses import loads
 
 
 class MeiliClient:
@@ -14,3 +20,122 @@ class MeiliClient:
     def search(self, q: str, opts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         opts = opts or {}
         return self.index.search(q, opts)
+
+
+def _error_message(r: httpx.Response) -> str:
+    try:
+        return loads(r.content)["message"]
+    except (ValueError, KeyError, TypeError):
+        return r.text or f"Meilisearch returned {r.status_code}"
+
+
+class AsyncMeiliClient:
+    """App-lifetime async Meilisearch client with a keep-alive connection pool.
+
+    One instance is created on application startup and shared by all requests,
+    so connections to Meilisearch are reused instead of being opened per search.
+    Pool size and timeouts can be tuned with ``MEILI_POOL_SIZE``,
+    ``MEILI_KEEPALIVE``, ``MEILI_TIMEOUT`` and ``MEILI_CONNECT_TIMEOUT``.
+    With ``metrics``, every round-trip's latency and response size is recorded.
+    A request Meilisearch rejects as invalid (400, e.g. a bad ``filter``)
+    raises ``HTTPException(422)`` with Meilisearch's message.
+    """
+
+    def __init__(
+        self,
+        index_name: str = "events",
+        url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        keepalive: Optional[int] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        url = url or os.getenv("MEILI_URL", "http://localhost:7700")
+        key = api_key if api_key is not None else os.getenv("MEILI_API_KEY")
+        pool_size = pool_size or int(os.getenv("MEILI_POOL_SIZE", "20"))
+        keepalive = keepalive or int(os.getenv("MEILI_KEEPALIVE", str(pool_size)))
+        timeout = timeout or float(os.getenv("MEILI_TIMEOUT", "5"))
+        connect_timeout = connect_timeout or float(os.getenv("MEILI_CONNECT_TIMEOUT", "2"))
+
+        headers = {"Authorization": f"Bearer {key}"} if key else {}
+        self.index_name = index_name
+        self.metrics = metrics
+        self.http = httpx.AsyncClient(
+            base_url=url.rstrip("/"),
+            headers=headers,
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=keepalive),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            transport=transport,
+        )
+
+    async def _request(self, op: str, method: str, url: str, **kwargs) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            r = await self.http.request(method, url, **kwargs)
+            if r.status_code == 400:
+                # the request itself is invalid (invalid_search_filter,
+                # invalid_search_sort, ...): the client's fault, not Meilisearch's
+                raise HTTPException(status_code=422, detail=_error_message(r))
+            r.raise_for_status()
+        except HTTPException:
+            raise
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.meili_errors.inc(op=op)
+            raise
+        if self.metrics is not None:
+            self.metrics.meili_seconds.observe(time.perf_counter() - started, op=op)
+            self.metrics.meili_bytes.observe(len(r.content), op=op)
+        return r
+
+    async def search(self, q: str, opts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        payload = {"q": q, **(opts or {})}
+        r = await self._request("search", "POST", f"/indexes/{self.index_name}/search", json=payload)
+        return loads(r.content)
+
+    async def multi_search(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Run several searches against this index in one ``/multi-search`` call."""
+        payload = {"queries": [{"indexUid": self.index_name, **query} for query in queries]}
+        r = await self._request("multi_search", "POST", "/multi-search", json=payload)
+        return loads(r.content)["results"]
+
+    async def facet_search(self, facet_name: str, facet_query: str = "", q: str = "",
+                           filter: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Facet values matching ``facet_query`` among the documents matching ``q``/``filter``."""
+        payload: Dict[str, Any] = {"facetName": facet_name, "facetQuery": facet_query, "q": q}
+        if filter:
+            payload["filter"] = filter
+        r = await self._request("facet_search", "POST", f"/indexes/{self.index_name}/facet-search", json=payload)
+        return loads(r.content)["facetHits"]
+
+    async def iter_documents(self, fields: Optional[List[str]] = None, batch_size: int = 1000):
+        """Yield every document of the index, fetched ``batch_size`` at a time."""
+        params: Dict[str, Any] = {"limit": batch_size}
+        if fields:
+            params["fields"] = ",".join(fields)
+        offset = 0
+        while True:
+            r = await self._request("documents", "GET", f"/indexes/{self.index_name}/documents",
+                                    params={**params, "offset": offset})
+            page = loads(r.content)
+            for doc in page["results"]:
+                yield doc
+            offset += len(page["results"])
+            if not page["results"] or offset >= page.get("total", 0):
+                return
+
+    async def get_index_version(self) -> Optional[str]:
+        """Return the index ``updatedAt`` timestamp, used as a change marker."""
+        r = await self._request("index_version", "GET", f"/indexes/{self.index_name}")
+        return r.json().get("updatedAt")
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+
+def get_meili(request: Request) -> AsyncMeiliClient:
+    """FastAPI dependency returning the shared client created in ``create_app()``."""
+    return request.app.state.meili
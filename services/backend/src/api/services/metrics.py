@@ -0,0 +1,146 @@
+import logging
+import os
+import random
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import Request
+
+# seconds; Meilisearch round-trips are a few ms, post-processing well below that
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+HITS_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> Labels:
+    return tuple(sorted(labels.items()))
+
+
+def _fmt_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items) + "}"
+
+
+def _fmt_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _labels(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_fmt_labels(labels)} {_fmt_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format."""
+
+    def __init__(self, name: str, help: str, buckets: Iterable[float] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self.series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _labels(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _fmt_value(bound)
+                lines.append(f"{self.name}_bucket{_fmt_labels(labels, ('le', le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(labels)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(labels)} {count}")
+        return lines
+
+
+class Metrics:
+    """The app's metrics, rendered by ``GET /metrics``.
+
+    Everything lives in process memory; with several uvicorn workers or
+    replicas each one exposes its own series, which Prometheus aggregates.
+    """
+
+    def __init__(self) -> None:
+        self.http_seconds = Histogram("gigfusion_http_request_seconds", "HTTP request latency by route")
+        self.search_seconds = Histogram("gigfusion_search_seconds", "/search latency, end to end")
+        self.meili_seconds = Histogram("gigfusion_meili_request_seconds", "Meilisearch round-trip latency")
+        self.meili_bytes = Histogram("gigfusion_meili_response_bytes", "Meilisearch response body size",
+                                     BYTES_BUCKETS)
+        self.http_bytes = Histogram("gigfusion_http_response_bytes", "HTTP response body size by route",
+                                    BYTES_BUCKETS)
+        self.postprocess_seconds = Histogram("gigfusion_search_postprocess_seconds",
+                                             "Python post-processing of search results (facet recompute)")
+        self.hits = Histogram("gigfusion_search_hits", "Hits returned per /search response", HITS_BUCKETS)
+        self.meili_errors = Counter("gigfusion_meili_errors_total", "Failed Meilisearch requests")
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def add_collector(self, collect: Callable[[], List[str]]) -> None:
+        """Register a callback returning extra exposition lines at scrape time."""
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.http_seconds, self.http_bytes, self.search_seconds, self.meili_seconds, self.meili_bytes,
+                       self.postprocess_seconds, self.hits, self.meili_errors):
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            lines.extend(collect())
+        return "\n".join(lines) + "\n"
+
+
+def gauge_lines(name: str, help: str, value: float, kind: str = "gauge") -> List[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_fmt_value(value)}"]
+
+
+class SampledLogger:
+    """Per-request log lines for the hot path.
+
+    Only every ``1/rate``-th call on average is logged (``LOG_SAMPLE_RATE``,
+    default 0.01), and nothing is formatted unless the logger is enabled for
+    the level, so leaving it on costs next to nothing per request.
+    """
+
+    def __init__(self, logger: logging.Logger, rate: Optional[float] = None) -> None:
+        self.logger = logger
+        self.rate = rate if rate is not None else float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+
+    def log(self, level: int, msg: str, *args) -> None:
+        if self.rate <= 0 or not self.logger.isEnabledFor(level):
+            return
+        if self.rate >= 1 or random.random() < self.rate:
+            self.logger.log(level, msg, *args)
+
+    def debug(self, msg: str, *args) -> None:
+        self.log(logging.DEBUG, msg, *args)
+
+    def info(self, msg: str, *args) -> None:
+        self.log(logging.INFO, msg, *args)
+
+
+def get_metrics(request: Request) -> Metrics:
+    return request.app.state.metrics
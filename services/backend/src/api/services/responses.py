@@ -0,0 +1,30 @@
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:  # installed with fastapi[all]
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response for large, already well-formed payloads.
+
+    Returning it from a route skips the response-model validation of every
+    hit, and the body is encoded with orjson when it is installed.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import time
+import unicodedata
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from .meili import AsyncMeiliClient
+
+logger = logging.getLogger(__name__)
+
+SUGGEST_FIELDS = ("band", "location", "section")
+_GERMAN = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "Ä": "Ae", "Ö": "Oe", "Ü": "Ue"})
+
+
+def fold(text: str) -> str:
+    """Case- and accent-insensitive form: "Gebäude 9" -> "gebaude 9"."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def fold_variants(text: str) -> set:
+    """`fold()` plus the German transliteration, so "gebaeude" finds "Gebäude" too."""
+    return {fold(text), fold(text.translate(_GERMAN))}
+
+
+class SuggestIndex:
+    """Prefix index over the band, location and section values of the index.
+
+    Every value is stored under the folded form of each of its word starts
+    ("Club Volta" under "club volta" and "volta") in one sorted list, so a
+    lookup is a bisect plus a short scan and needs no Meilisearch call. The
+    index is rebuilt from the documents in Meilisearch on startup and whenever
+    the index version seen by the search cache changes; lookups keep using the
+    previous build until a rebuild has finished.
+    """
+
+    def __init__(self, meili: AsyncMeiliClient, max_scan: int = 5000, retry_interval: float = 5.0) -> None:
+        self.meili = meili
+        self.max_scan = max_scan
+        self.retry_interval = retry_interval
+        self.version: Optional[str] = None
+        self.built_at: Optional[float] = None
+        self.build_seconds = 0.0
+        self._keys: List[str] = []
+        # per key: (entry id, key is the start of the whole value)
+        self._entries: List[Tuple[int, bool]] = []
+        # entry id -> (value, field, document count)
+        self._values: List[Tuple[str, str, int]] = []
+        self._rebuild: Optional[asyncio.Task] = None
+        self._failed_at = 0.0
+
+    def build(self, documents: List[Dict[str, Any]], version: Optional[str] = None) -> None:
+        counts: Dict[Tuple[str, str], int] = {}
+        for doc in documents:
+            for field in SUGGEST_FIELDS:
+                value = doc.get(field)
+                if isinstance(value, str) and value.strip():
+                    key = (" ".join(value.split()), field)
+                    counts[key] = counts.get(key, 0) + 1
+
+        values = sorted((value, field, n) for (value, field), n in counts.items())
+        pairs = set()
+        for i, (value, _, _) in enumerate(values):
+            for variant in fold_variants(value):
+                words = variant.split(" ")
+                for start in range(len(words)):
+                    pairs.add((" ".join(words[start:]), i, start == 0))
+        pairs = sorted(pairs)
+        # swap in one step; a lookup running concurrently sees old or new
+        self._keys, self._entries, self._values = [p[0] for p in pairs], [p[1:] for p in pairs], values
+        self.version = version
+        self.built_at = time.time()
+
+    def suggest(self, prefix: str, limit: int = 10, fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Values with a word starting with `prefix`; whole-value prefix matches
+        first, then by document count. A value found in several fields is
+        listed once, under the first of SUGGEST_FIELDS."""
+        folded = fold(prefix)
+        if not folded:
+            return []
+        keys, entries, values = self._keys, self._entries, self._values
+        found: Dict[int, bool] = {}
+        i = bisect_left(keys, folded)
+        end = min(len(keys), i + self.max_scan)
+        while i < end and keys[i].startswith(folded):
+            entry, whole = entries[i]
+            if fields is None or values[entry][1] in fields:
+                found[entry] = found.get(entry, False) or whole
+            i += 1
+        order = {field: i for i, field in enumerate(SUGGEST_FIELDS)}
+        ranked = sorted(found.items(), key=lambda e: (not e[1], -values[e[0]][2], values[e[0]][0],
+                                                      order[values[e[0]][1]]))
+        suggestions, seen = [], set()
+        for entry, _ in ranked:
+            value, field, count = values[entry]
+            # a venue is usually also a section heading; list it once
+            if value in seen:
+                continue
+            seen.add(value)
+            suggestions.append({"value": value, "field": field, "count": count})
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+    async def rebuild(self, version: Optional[str] = None) -> None:
+        started = time.perf_counter()
+        documents = [doc async for doc in self.meili.iter_documents(fields=list(SUGGEST_FIELDS))]
+        self.build(documents, version)
+        self.build_seconds = time.perf_counter() - started
+        logger.info("Suggest index: %d values from %d documents in %.2fs",
+                    len(self._values), len(documents), self.build_seconds)
+
+    def ensure_current(self, version: Optional[str]) -> None:
+        """Start a background rebuild if the index version moved on."""
+        if self.built_at is not None and version == self.version:
+            return
+        if self._rebuild is not None and not self._rebuild.done():
+            return
+        if time.monotonic() - self._failed_at < self.retry_interval:
+            return
+        self._rebuild = asyncio.ensure_future(self._rebuild_logged(version))
+
+    async def _rebuild_logged(self, version: Optional[str]) -> None:
+        try:
+            await self.rebuild(version)
+        except Exception as e:
+            # keep the previous build; a later request retries
+            self._failed_at = time.monotonic()
+            logger.warning("Suggest index rebuild failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "values": len(self._values),
+            "keys": len(self._keys),
+            "built_at": self.built_at,
+            "build_seconds": round(self.build_seconds, 4),
+        }
+
+
+def get_suggest_index(request: Request) -> SuggestIndex:
+    return request.app.state.suggest_index
@@ -40,7 +40,8 @@ function Search() {
       const filter = buildFilter(useSel)
       const useLimit = typeof limitOverride === 'number' ? limitOverride : limit
       const weekdayParam = (useSel.weekday && useSel.weekday.length) ? `&weekday=${encodeURIComponent(useSel.weekday.join(','))}` : ''
-      const url = `${base}/search?q=${encodeURIComponent(q)}&limit=${useLimit}${filter ? `&filter=${encodeURIComponent(filter)}` : ''}${weekdayParam}`
+      // only the facets the panel shows; the backend counts none unless asked
+      const url = `${base}/search?q=${encodeURIComponent(q)}&limit=${useLimit}${filter ? `&filter=${encodeURIComponent(filter)}` : ''}${weekdayParam}&facets=location,band,status_kind,weekday`
       const r = await fetch(url)
       const j = await r.json()
       setRes(j)
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Offline benchmark for the scraper's parsing pipeline.
+
+Runs against the pages in `benchmarks/fixtures/*.html` plus synthetic
+pages scaled up from them, and times every stage separately:
+
+  html_to_lines   HTML -> text lines (`run_scraper.html_to_lines`)
+  regex_match     event regex over every line (`build_event_pattern`)
+  date_inference  `infer_event_date` for every matched line
+  status_parsing  `parse_status` for every matched line
+  parse_lines     the whole line parser end to end
+
+For each stage it reports seconds, lines/s and peak traced memory. Every HTML
+backend (`--html-backend` picks the one the later stages use) is also timed
+and its line list compared with the original "bs4" path. Lines whose
+event-regex match exceeds `--line-budget-ms` (fastest of several runs, with
+the garbage collector off) are flagged; an adversarial case of long, oddly
+shaped lines is included to catch catastrophic backtracking. The exit status
+is 1 if any line is over the budget or any backend's lines differ.
+Use `--json` to write machine-readable results for comparison across releases.
+
+Usage examples:
+  python benchmarks/bench_parser.py
+  python benchmarks/bench_parser.py --scale 10000 100000 --json bench.json
+  python benchmarks/bench_parser.py --record https://underdogrecordstore.de/vorverkauf
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from html import escape
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+import run_scraper  # noqa: E402
+
+FIXTURES = os.path.join(HERE, "fixtures")
+# fixed reference date so date inference is reproducible
+NOW = datetime(2025, 9, 30, 21, 0, 0)
+# a line over the budget is matched this many more times and only the fastest
+# run counts, so a scheduler hiccup is not reported as backtracking
+RETIME = 5
+
+
+def record(url, directory=FIXTURES):
+    import requests
+
+    r = requests.get(url, timeout=20)
+    r.raise_for_status()
+    path = os.path.join(directory, f"underdog_vorverkauf_{datetime.now().strftime('%Y%m%d')}.html")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(r.text)
+    print(f"Recorded {url} -> {path}")
+    return path
+
+
+def synthetic_page(seed_lines, n_lines, seed=0):
+    """HTML page with about `n_lines` lines built from the event lines and
+    section headings of a recorded page (dates, prices and statuses varied)."""
+    rnd = random.Random(seed)
+    sections = [ln[:-1] for ln in seed_lines if ln.endswith(":")] or ["Club Volta"]
+    events = [ln for ln in seed_lines if ln[:2].isdigit() and ln[2:3] == "."] or ["30.09. Band 20 €"]
+    statuses = ["", "", "", " Ausverkauft!", " abgesagt", " verlegt in die {loc}", " Verlegt nach {loc} (neuer Termin)"]
+
+    out = ["<html><body>"]
+    count = 0
+    while count < n_lines:
+        out.append(f"<h2>{escape(rnd.choice(sections))}:</h2><p>")
+        for _ in range(rnd.randint(20, 80)):
+            base = rnd.choice(events)[7:]
+            status = rnd.choice(statuses).format(loc=rnd.choice(sections))
+            out.append(f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}. {escape(base)}{escape(status)}<br>")
+            count += 1
+        out.append("</p>")
+        count += 1
+    out.append("</body></html>")
+    return "\n".join(out)
+
+
+def adversarial_page(repeat=3):
+    """Long lines shaped to make the lazy band/location groups and the
+    lookaheads in the event regex work hard. Matching is linear at about
+    0.15 µs per character, so lines are kept to about 20k characters or
+    less: backtracking would still be orders of magnitude over the budget."""
+    lines = [
+        "01.01. " + "x " * 5000,
+        "01.01. " + "@ " * 3000,
+        "01.01. Band " + "1," * 3000,
+        "01.01. " + "a" * 20000 + " 12 €",
+        "01.01. Band @ " + "Loc " * 4000 + "verlegt",
+        "01.01. Band @ Loc " + "ab 1 " * 2000,
+        "01.01. " + "Ausverkauft " * 2000,
+        "01.01. Band verlegt " + "in die Halle " * 1000,
+    ]
+    body = "<br>\n".join(escape(ln) for ln in lines * repeat)
+    return f"<html><body><h2>Club Volta:</h2><p>{body}</p></body></html>"
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def _peak_kb(fn):
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def bench_backends(html):
+    """Time every HTML backend and check its lines against the bs4 path."""
+    reference = run_scraper.html_to_lines(html, backend="bs4")
+    out = {}
+    for backend in run_scraper.HTML_BACKENDS:
+        try:
+            lines, seconds = _timed(lambda: run_scraper.html_to_lines(html, backend=backend))
+        except ImportError as e:
+            out[backend] = {"error": str(e)}
+            continue
+        out[backend] = {
+            "seconds": round(seconds, 6),
+            "peak_kb": _peak_kb(lambda: run_scraper.html_to_lines(html, backend=backend)),
+            "identical": lines == reference,
+        }
+    return out
+
+
+def bench_case(name, html, line_budget_ms, backend="stream"):
+    event_re = run_scraper.build_event_pattern()
+    lines, t_html = _timed(lambda: run_scraper.html_to_lines(html, backend=backend))
+    matcher = run_scraper.LocationMatcher(run_scraper.fetch_locations_from_headings(lines))
+
+    # regex stage, timed per line to flag slow (backtracking) lines
+    matches = []
+    over = []
+    # a collection pause would be charged to whichever line triggered it
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        for line in lines:
+            t0 = time.perf_counter()
+            m = event_re.match(line)
+            dt = time.perf_counter() - t0
+            if dt * 1000 > line_budget_ms:
+                over.append(line)
+            if m:
+                matches.append((line, m))
+        t_regex = time.perf_counter() - started
+        slow = []
+        for line in over:
+            dt = min(_timed(lambda: event_re.match(line))[1] for _ in range(RETIME))
+            if dt * 1000 > line_budget_ms:
+                slow.append({"case": name, "length": len(line), "ms": round(dt * 1000, 3), "line": line[:80]})
+    finally:
+        gc.enable()
+
+    def dates():
+        for _, m in matches:
+            run_scraper.infer_event_date(m.group("date"), NOW)
+
+    def statuses():
+        for line, _ in matches:
+            run_scraper.parse_status(line, matcher)
+
+    def parse():
+        return run_scraper.parse_lines(lines, now=NOW)
+
+    _, t_dates = _timed(dates)
+    _, t_status = _timed(statuses)
+    events, t_parse = _timed(parse)
+
+    def stage(seconds, peak_kb, n=len(lines)):
+        return {
+            "seconds": round(seconds, 6),
+            "lines_per_s": round(n / seconds) if seconds else None,
+            "peak_kb": peak_kb,
+        }
+
+    return {
+        "name": name,
+        "html_bytes": len(html.encode("utf-8")),
+        "lines": len(lines),
+        "matched": len(matches),
+        "events": len(events),
+        "stages": {
+            "html_to_lines": stage(t_html, _peak_kb(lambda: run_scraper.html_to_lines(html, backend=backend))),
+            "regex_match": stage(t_regex, _peak_kb(lambda: [event_re.match(ln) for ln in lines])),
+            "date_inference": stage(t_dates, _peak_kb(dates), len(matches)),
+            "status_parsing": stage(t_status, _peak_kb(statuses), len(matches)),
+            "parse_lines": stage(t_parse, _peak_kb(parse)),
+        },
+        "html_backends": bench_backends(html),
+        "slow_lines": slow,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_case(case):
+    print(f"\n{case['name']}: {case['lines']} lines, {case['matched']} matched, {case['events']} events")
+    for stage, r in case["stages"].items():
+        lps = f"{r['lines_per_s']:>12,}" if r["lines_per_s"] else f"{'-':>12}"
+        print(f"  {stage:<16} {r['seconds']:>10.4f}s {lps} lines/s {r['peak_kb']:>10,} KiB peak")
+    for backend, r in case["html_backends"].items():
+        if "error" in r:
+            print(f"  html[{backend}]{'':<{10 - len(backend)}} unavailable: {r['error']}")
+        else:
+            same = "identical" if r["identical"] else "DIFFERS from bs4"
+            print(f"  html[{backend}]{'':<{10 - len(backend)}} {r['seconds']:>10.4f}s {r['peak_kb']:>23,} KiB peak  {same}")
+    for s in case["slow_lines"][:5]:
+        print(f"  SLOW {s['ms']:.2f} ms ({s['length']} chars): {s['line']!r}")
+    if len(case["slow_lines"]) > 5:
+        print(f"  ... {len(case['slow_lines']) - 5} more slow lines")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--fixtures", default=FIXTURES, help="Directory with recorded *.html pages")
+    parser.add_argument("--scale", type=int, nargs="*", default=[10_000, 100_000],
+                        help="Line counts of the synthetic pages")
+    parser.add_argument("--line-budget-ms", type=float, default=5.0,
+                        help="Flag lines whose regex match takes longer than this")
+    parser.add_argument("--html-backend", choices=run_scraper.HTML_BACKENDS, default="stream",
+                        help="HTML backend used for the line-based stages")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--record", metavar="URL", help="Save a live page into --fixtures and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.record, args.fixtures)
+        return
+
+    pages = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not pages:
+        print(f"No fixtures in {args.fixtures}; record one with --record URL")
+        sys.exit(2)
+
+    cases = []
+    seed_lines = []
+    for path in pages:
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        seed_lines.extend(run_scraper.html_to_lines(html, backend="bs4"))
+        cases.append(bench_case(f"fixture:{os.path.basename(path)}", html, args.line_budget_ms, args.html_backend))
+    for n in args.scale:
+        cases.append(bench_case(f"synthetic:{n}", synthetic_page(seed_lines, n), args.line_budget_ms, args.html_backend))
+    cases.append(bench_case("adversarial", adversarial_page(), args.line_budget_ms, args.html_backend))
+
+    for case in cases:
+        print_case(case)
+
+    slow = [s for case in cases for s in case["slow_lines"]]
+    results = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "line_budget_ms": args.line_budget_ms,
+            "html_backend": args.html_backend,
+        },
+        "cases": cases,
+        "slow_lines": len(slow),
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nWrote {args.json}")
+    if slow:
+        print(f"\n{len(slow)} lines exceeded the {args.line_budget_ms} ms budget")
+    differs = [c["name"] for c in cases for r in c["html_backends"].values() if r.get("identical") is False]
+    if differs:
+        print(f"\nHTML backend output differs from bs4 in: {', '.join(sorted(set(differs)))}")
+    if slow or differs:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
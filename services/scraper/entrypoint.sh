@@ -7,6 +7,7 @@ set -e
 MEILI_URL="${MEILI_URL:-}"
 MEILI_API_KEY="${MEILI_API_KEY:-}"
 DATA_PATH="/data/raw/underdog"
+DAEMON="${SCRAPER_DAEMON:-false}"
 while [ $# -gt 0 ]; do
   case "$1" in
     --meili-url)
@@ -21,12 +22,40 @@ while [ $# -gt 0 ]; do
       DATA_PATH="$2"
       shift 2
       ;;
+    --daemon)
+      DAEMON=true
+      shift
+      ;;
     *)
       shift
       ;;
   esac
 done
 
-# Run the scraper and then reindex the data
-python3 /scripts/run_scraper.py --path "$DATA_PATH"
-python3 /scripts/run_reindex.py --meili-url "$MEILI_URL" --api-key "$MEILI_API_KEY" --path "$DATA_PATH"
\ No newline at end of file
+# a fresh volume mounted over /data/raw does not have the directory yet
+mkdir -p "$DATA_PATH"
+
+# per-stage timings of both steps, in Prometheus text format
+METRICS_DIR="${METRICS_DIR:-$DATA_PATH/metrics}"
+
+# Long-running mode for a Deployment: scrape and index in one process on an
+# internal schedule (SCRAPER_INTERVAL/SCRAPER_JITTER), health on :8080/healthz
+if [ "$DAEMON" = "true" ] || [ "$DAEMON" = "1" ]; then
+  exec python3 /scripts/run_scraper.py --daemon --path "$DATA_PATH" --meili-url "$MEILI_URL" \
+    --api-key "$MEILI_API_KEY" --metrics-file "$METRICS_DIR/scraper.prom"
+fi
+
+# Run the scraper and then reindex the data; exit status 3 means the page did
+# not change since the last run, so only a snapshot whose reindex failed
+# earlier still needs indexing (--skip-indexed checks the scrape state)
+status=0
+python3 /scripts/run_scraper.py --path "$DATA_PATH" --metrics-file "$METRICS_DIR/scraper.prom" || status=$?
+SKIP_INDEXED=""
+if [ "$status" -eq 3 ]; then
+  echo "Events unchanged, reindexing only if the latest snapshot is not indexed yet"
+  SKIP_INDEXED="--skip-indexed"
+elif [ "$status" -ne 0 ]; then
+  exit "$status"
+fi
+python3 /scripts/run_reindex.py --meili-url "$MEILI_URL" --api-key "$MEILI_API_KEY" --path "$DATA_PATH" --mode delta \
+  --metrics-file "$METRICS_DIR/reindex.prom" $SKIP_INDEXED
\ No newline at end of file
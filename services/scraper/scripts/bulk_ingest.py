@@ -0,0 +1,181 @@
+"""Batched, task-aware document upload to Meilisearch.
+
+`BulkIngester` splits documents into batches, keeps at most `max_in_flight`
+batches enqueued at a time, waits for every Meilisearch task (with a timeout)
+and collects a report with throughput, per-batch latency and failures.
+`sync_settings` applies only the settings that differ from the index, and is
+meant to run before any documents are sent so Meilisearch indexes them once.
+"""
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from meilisearch.errors import MeilisearchApiError, MeilisearchTimeoutError
+
+# settings where the order of the list is irrelevant
+_UNORDERED = {"filterableAttributes", "sortableAttributes"}
+
+
+def _same_setting(key: str, want: Any, have: Any) -> bool:
+    if isinstance(want, dict):
+        have = have or {}
+        return all(_same_setting(k, v, have.get(k)) for k, v in want.items())
+    if key in _UNORDERED and isinstance(want, list) and isinstance(have, list):
+        return sorted(want) == sorted(have)
+    return want == have
+
+
+def diff_settings(wanted: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the subset of `wanted` that differs from the index's current settings."""
+    return {k: v for k, v in wanted.items() if not _same_setting(k, v, current.get(k))}
+
+
+def wait_for_task(client, task_uid: int, timeout: float = 300.0, poll_interval: float = 0.1):
+    """Poll a task until it finished; raise RuntimeError if it failed or timed out."""
+    try:
+        task = client.wait_for_task(task_uid, timeout_in_ms=int(timeout * 1000),
+                                    interval_in_ms=int(poll_interval * 1000))
+    except MeilisearchTimeoutError as e:
+        raise RuntimeError(f"Meilisearch task {task_uid} did not finish within {timeout}s") from e
+    if task.status != "succeeded":
+        raise RuntimeError(f"Meilisearch task {task.uid} ({task.type}) {task.status}: {task.error}")
+    return task
+
+
+def sync_settings(client, index, wanted: Dict[str, Any], timeout: float = 300.0) -> Dict[str, Any]:
+    """Apply the settings that changed and wait for them; returns what was applied."""
+    try:
+        current = index.get_settings()
+    except MeilisearchApiError as e:
+        if e.code != "index_not_found":
+            raise
+        current = {}
+    changed = diff_settings(wanted, current)
+    if changed:
+        wait_for_task(client, index.update_settings(changed).task_uid, timeout=timeout)
+    return changed
+
+
+class IngestReport:
+    def __init__(self) -> None:
+        self.documents = 0
+        self.deleted = 0
+        self.batches = 0
+        self.latencies: List[float] = []
+        self.failures: List[Dict[str, Any]] = []
+        self.elapsed = 0.0
+
+    @property
+    def docs_per_second(self) -> float:
+        return self.documents / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        lat = sorted(self.latencies)
+        return {
+            "documents": self.documents,
+            "deleted": self.deleted,
+            "batches": self.batches,
+            "failed_batches": len(self.failures),
+            "elapsed_s": round(self.elapsed, 3),
+            "docs_per_s": round(self.docs_per_second, 1),
+            "batch_latency_s": {
+                "min": round(lat[0], 3) if lat else None,
+                "avg": round(sum(lat) / len(lat), 3) if lat else None,
+                "p95": round(lat[int(0.95 * (len(lat) - 1))], 3) if lat else None,
+                "max": round(lat[-1], 3) if lat else None,
+            },
+            "failures": self.failures,
+        }
+
+    def __str__(self) -> str:
+        d = self.as_dict()
+        lat = d["batch_latency_s"]
+        return (f"{d['documents']} documents in {d['batches']} batches ({d['deleted']} deleted), "
+                f"{d['elapsed_s']}s, {d['docs_per_s']} docs/s, batch latency avg {lat['avg']}s "
+                f"max {lat['max']}s, {d['failed_batches']} failed")
+
+
+class BulkIngester:
+    """Upload documents in batches with a bounded number of in-flight tasks.
+
+    Call `add()` with any iterable (it is consumed lazily, one batch at a
+    time), optionally `delete()`, then `finish()` to wait for the remaining
+    tasks and get the `IngestReport`.
+    """
+
+    def __init__(self, client, index_name: str, primary_key: str = "id", batch_size: int = 1000,
+                 max_in_flight: int = 4, task_timeout: float = 300.0, poll_interval: float = 0.1) -> None:
+        self.client = client
+        self.index = client.index(index_name)
+        self.primary_key = primary_key
+        self.batch_size = batch_size
+        self.max_in_flight = max(1, max_in_flight)
+        self.task_timeout = task_timeout
+        self.poll_interval = poll_interval
+        self.report = IngestReport()
+        self._batch: List[Dict[str, Any]] = []
+        self._in_flight: deque = deque()
+        self._started = time.perf_counter()
+
+    def add(self, docs: Iterable[Dict[str, Any]]) -> None:
+        for doc in docs:
+            self._batch.append(doc)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def delete(self, ids: List[str]) -> None:
+        for i in range(0, len(ids), self.batch_size):
+            chunk = ids[i:i + self.batch_size]
+            self._submit(lambda: self.index.delete_documents(chunk), deleted=len(chunk))
+
+    def finish(self) -> IngestReport:
+        self._flush()
+        while self._in_flight:
+            self._wait_oldest()
+        self.report.elapsed = time.perf_counter() - self._started
+        return self.report
+
+    def _flush(self) -> None:
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self._submit(lambda: self.index.add_documents(batch, primary_key=self.primary_key), documents=len(batch))
+
+    def _submit(self, send, documents: int = 0, deleted: int = 0) -> None:
+        while len(self._in_flight) >= self.max_in_flight:
+            self._wait_oldest()
+        self.report.batches += 1
+        batch_no = self.report.batches
+        started = time.perf_counter()
+        try:
+            task_uid = send().task_uid
+        except MeilisearchApiError as e:
+            self.report.failures.append({"batch": batch_no, "error": str(e)})
+            return
+        self._in_flight.append((batch_no, task_uid, started, documents, deleted))
+
+    def _wait_oldest(self) -> None:
+        batch_no, task_uid, started, documents, deleted = self._in_flight.popleft()
+        try:
+            wait_for_task(self.client, task_uid, timeout=self.task_timeout, poll_interval=self.poll_interval)
+        except RuntimeError as e:
+            self.report.failures.append({"batch": batch_no, "task": task_uid, "error": str(e)})
+            return
+        self.report.latencies.append(time.perf_counter() - started)
+        self.report.documents += documents
+        self.report.deleted += deleted
+
+
+def ingest(client, index_name: str, docs: Iterable[Dict[str, Any]], settings: Optional[Dict[str, Any]] = None,
+           delete_ids: Optional[List[str]] = None, **opts) -> IngestReport:
+    """Settings first (only if changed), then documents and deletions in batches."""
+    if settings:
+        changed = sync_settings(client, client.index(index_name), settings,
+                                timeout=opts.get("task_timeout", 300.0))
+        if changed:
+            print(f"Updated settings: {', '.join(sorted(changed))}")
+    ingester = BulkIngester(client, index_name, **opts)
+    ingester.add(docs)
+    if delete_ids:
+        ingester.delete(delete_ids)
+    return ingester.finish()
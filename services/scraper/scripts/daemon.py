@@ -0,0 +1,145 @@
+"""Run the scraper as a long-lived process (`run_scraper.py --daemon`).
+
+`Daemon` calls a cycle function every `interval` seconds plus a random delay
+of up to `jitter` seconds, so several replicas or restarts do not hit the
+source sites in lockstep. Each cycle gets a fresh `StageTimer`; its summary
+goes to the metrics file like a CronJob run's would, and is also served by
+the health server:
+
+  GET /healthz  200 while the last successful cycle is recent enough
+                (`max_age`, default three intervals), 503 otherwise; the body
+                is a JSON status (cycles, last outcome and error, next run)
+  GET /metrics  the last cycle's stage timings in Prometheus text format
+
+SIGTERM and SIGINT end the loop after the running cycle.
+"""
+import json
+import logging
+import random
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from stage_metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="seconds") if ts else None
+
+
+class Daemon:
+    """Calls `cycle(timer)` on a schedule; it returns "ok" or "unchanged", or raises."""
+
+    def __init__(
+        self,
+        cycle: Callable[[StageTimer], Optional[str]],
+        interval: float = 3600,
+        jitter: float = 300,
+        metrics_file: Optional[str] = None,
+        max_age: Optional[float] = None,
+        job: str = "scraper",
+    ) -> None:
+        self.cycle = cycle
+        self.interval = interval
+        self.jitter = jitter
+        self.metrics_file = metrics_file
+        self.max_age = max_age or 3 * (interval + jitter)
+        self.job = job
+        self.started = time.time()
+        self.cycles = 0
+        self.failures = 0
+        self.last_status: Optional[str] = None
+        self.last_error: Optional[str] = None
+        self.last_run: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.next_run: Optional[float] = None
+        self.last_timer: Optional[StageTimer] = None
+        self._stop = threading.Event()
+
+    def run_once(self) -> str:
+        timer = StageTimer(self.job)
+        self.last_run = timer.started
+        try:
+            timer.status = self.cycle(timer) or "ok"
+        except Exception as e:
+            timer.status = "failed"
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Scrape cycle failed")
+        else:
+            self.last_success = time.time()
+            self.last_error = None
+        finally:
+            self.cycles += 1
+            self.last_status = timer.status
+            self.last_timer = timer
+            timer.write(self.metrics_file)
+        return timer.status
+
+    def run_forever(self) -> None:
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: self.stop())
+        while not self._stop.is_set():
+            status = self.run_once()
+            delay = self.interval + random.uniform(0, self.jitter)
+            self.next_run = time.time() + delay
+            print(f"Cycle {self.cycles}: {status}; next run in {delay:.0f}s", flush=True)
+            self._stop.wait(delay)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def healthy(self) -> bool:
+        # before the first success, count from the start of the process
+        return time.time() - (self.last_success or self.started) < self.max_age
+
+    def status(self) -> dict:
+        return {
+            "healthy": self.healthy(),
+            "started": _iso(self.started),
+            "cycles": self.cycles,
+            "failures": self.failures,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "last_run": _iso(self.last_run),
+            "last_success": _iso(self.last_success),
+            "next_run": _iso(self.next_run),
+            "interval": self.interval,
+        }
+
+    def serve_health(self, port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+        """Start the health server in a background thread."""
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] == "/healthz":
+                    code = 200 if daemon.healthy() else 503
+                    self._send(code, "application/json", json.dumps(daemon.status()) + "\n")
+                elif self.path.split("?")[0] == "/metrics":
+                    timer = daemon.last_timer
+                    self._send(200, "text/plain; version=0.0.4", timer.prometheus() if timer else "")
+                else:
+                    self._send(404, "text/plain", "not found\n")
+
+            def _send(self, code: int, content_type: str, body: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                # probes hit this every few seconds
+                logger.debug("health: " + format, *args)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="health", daemon=True).start()
+        print(f"Health endpoint on :{port}/healthz", flush=True)
+        return server
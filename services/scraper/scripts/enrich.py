@@ -0,0 +1,128 @@
+"""Concurrent band enrichment stage.
+
+Runs after parsing: band names are de-duplicated across all events, answered
+from the `BandInfoCache` where possible, and the rest are looked up by a
+worker pool. All workers share one `TokenBucket`, so the request rate stays
+within MusicBrainz's 1 req/s policy no matter how many workers run, and a
+worker sleeping in a retry backoff does not hold up the others. A time budget
+stops new lookups so a scrape never overruns the CronJob window; bands that
+were not looked up, or whose lookup failed, keep the members/genres the event
+already had (and are not cached).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+from mb_cache import BandInfoCache, normalize_band
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second."""
+
+    def __init__(self, rate: float = 1.0, capacity: float = 1.0) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Block until a token is available; False if that would pass `deadline`
+        (a `time.monotonic()` value)."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class Enricher:
+    """Attach `members`/`genres` to events via `lookup(name, limiter=, deadline=)`.
+
+    `lookup` is `run_scraper.get_band_info`, or a stand-in in tests. Results
+    with `match == "error"` (network failure, budget exhausted) are not cached.
+    """
+
+    def __init__(
+        self,
+        lookup: Callable[..., Optional[dict]],
+        cache: Optional[BandInfoCache] = None,
+        workers: int = 4,
+        rate: float = 1.0,
+        time_budget: Optional[float] = None,
+    ) -> None:
+        self.lookup = lookup
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.limiter = TokenBucket(rate=rate)
+        self.time_budget = time_budget
+        self.stats: Dict[str, int] = {}
+
+    def run(self, events: List[dict]) -> List[dict]:
+        deadline = time.monotonic() + self.time_budget if self.time_budget else None
+
+        names: Dict[str, str] = {}
+        for e in events:
+            names.setdefault(normalize_band(e["band"]), e["band"])
+
+        results: Dict[str, dict] = {}
+        pending = []
+        for key, name in names.items():
+            info = self.cache.get(name) if self.cache is not None else None
+            if info is not None:
+                results[key] = info
+            else:
+                pending.append((key, name))
+
+        self.stats = {"bands": len(names), "cached": len(results), "looked_up": 0, "errors": 0, "skipped": 0}
+        if pending:
+            self._lookup_all(pending, results, deadline)
+
+        # join the results back onto the events in one pass; a band that was
+        # skipped or failed keeps whatever the event already had
+        for e in events:
+            info = results.get(normalize_band(e["band"]))
+            if info is not None:
+                e["members"] = info["members"]
+                e["genres"] = info["genres"]
+            else:
+                e.setdefault("members", [])
+                e.setdefault("genres", [])
+        return events
+
+    def _lookup_one(self, name: str, deadline: Optional[float]) -> Optional[dict]:
+        if deadline is not None and time.monotonic() >= deadline:
+            return None
+        return self.lookup(name, limiter=self.limiter, deadline=deadline)
+
+    def _lookup_all(self, pending, results: Dict[str, dict], deadline: Optional[float]) -> None:
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="enrich") as pool:
+            futures = {pool.submit(self._lookup_one, name, deadline): (key, name) for key, name in pending}
+            for fut in as_completed(futures):
+                key, name = futures[fut]
+                try:
+                    info = fut.result()
+                except Exception as e:
+                    logger.warning("Lookup of %r failed: %s", name, e)
+                    info = {"members": [], "genres": [], "match": "error"}
+                if info is None:
+                    self.stats["skipped"] += 1
+                    continue
+                if info.get("match") == "error":
+                    self.stats["errors"] += 1
+                    continue
+                self.stats["looked_up"] += 1
+                if self.cache is not None:
+                    self.cache.put(name, info)
+                results[key] = info
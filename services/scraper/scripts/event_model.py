@@ -0,0 +1,147 @@
+"""Compact event record shared by the scraper and the reindexer.
+
+`Event` keeps its fields in `__slots__` instead of a per-event dict. Venue,
+section, status and source strings are interned, so the thousands of events
+of a multi-source, multi-year history share one copy of each, and events
+without members/genres share one empty tuple. The record still supports the
+dict-style access (`e["band"]`, `.get()`, `.items()`) used by the parsing,
+merging and enrichment code.
+
+`to_json()` writes the NDJSON line straight from the slots and `to_dict()`
+gives the snapshot dict (ISO `date`) in one step, replacing the `isoify()`
+copy. Fields that were never set, such as the index fields before
+`run_reindex` adds them, are left out of both, so a snapshot round-trips
+unchanged and content hashes stay stable.
+"""
+import json
+import operator
+import sys
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# scraped fields, then the Meilisearch fields added by run_reindex; this is
+# also the key order of snapshots
+FIELDS = (
+    "origin", "date", "band", "location", "price_eur", "status_kind", "new_location",
+    "status_raw", "section", "members", "genres", "source", "sources",
+    "id", "day", "weekday", "date_ts", "content_hash",
+)
+INTERNED = frozenset(("location", "status_kind", "new_location", "section", "source"))
+_UNSET = object()
+_KEYS = {name: encode_basestring(name) + ":" for name in FIELDS}
+_KEY_LIST = [_KEYS[name] for name in FIELDS]
+_get_fields = operator.attrgetter(*FIELDS)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def _json_value(value) -> str:
+    kind = type(value)
+    if kind is str:
+        return encode_basestring(value)
+    if value is None:
+        return "null"
+    if kind is int or (kind is float and value - value == 0):
+        return repr(value)
+    if isinstance(value, datetime):
+        return '"' + value.isoformat() + '"'
+    if isinstance(value, (list, tuple)) and all(type(v) is str for v in value):
+        return "[" + ",".join(map(encode_basestring, value)) + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+class Event:
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, date=None, band: str = "", location: str = "", **fields: Any) -> None:
+        self._clear()
+        self.date = date
+        self.band = band
+        self.location = _intern(location)
+        for name, value in fields.items():
+            self[name] = value
+
+    def _clear(self) -> None:
+        for name in FIELDS:
+            setattr(self, name, _UNSET)
+        self.members = ()
+        self.genres = ()
+        self.extra: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Event":
+        """Event from a snapshot dict; an ISO `date` string becomes a datetime."""
+        e = cls.__new__(cls)
+        e._clear()
+        for name, value in d.items():
+            e[name] = value
+        if isinstance(e.date, str):
+            try:
+                e.date = datetime.fromisoformat(e.date)
+            except ValueError:
+                pass
+        return e
+
+    # dict-style access
+
+    def __getitem__(self, name: str) -> Any:
+        value = getattr(self, name) if name in _KEYS else (self.extra or {}).get(name, _UNSET)
+        if value is _UNSET:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name: str, value: Any) -> None:
+        if name in _KEYS:
+            if name in ("members", "genres") and not value:
+                value = ()
+            setattr(self, name, _intern(value) if name in INTERNED else value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[name] = value
+
+    def __contains__(self, name: str) -> bool:
+        return self.get(name, _UNSET) is not _UNSET
+
+    def get(self, name: str, default: Any = None) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+    def setdefault(self, name: str, default: Any = None) -> Any:
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        for name, value in zip(FIELDS, _get_fields(self)):
+            if value is not _UNSET:
+                yield name, value
+        if self.extra:
+            yield from self.extra.items()
+
+    def __repr__(self) -> str:
+        return f"Event({self.date!r}, {self.band!r}, {self.location!r})"
+
+    # serialization
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = dict(self.items())
+        if isinstance(d.get("date"), datetime):
+            d["date"] = d["date"].isoformat()
+        for name in ("members", "genres"):
+            if type(d.get(name)) is tuple:
+                d[name] = list(d[name])
+        return d
+
+    def to_json(self) -> str:
+        """Compact JSON object (one NDJSON line, without the newline)."""
+        parts = [key + _json_value(value) for key, value in zip(_KEY_LIST, _get_fields(self)) if value is not _UNSET]
+        if self.extra:
+            for name, value in self.extra.items():
+                parts.append(encode_basestring(name) + ":" + _json_value(value))
+        return "{" + ",".join(parts) + "}"
@@ -0,0 +1,206 @@
+"""Event history compacted from the snapshots into SQLite.
+
+    python history.py --path /data/raw/underdog            # ingest new snapshots
+    python history.py --path /data/raw/underdog --event ID # print one event's history
+
+`history.sqlite` next to the snapshots holds two tables:
+
+  snapshots       one row per saved or ingested snapshot file (name, time,
+                  event count, whether its events were applied);
+                  `snapshots.find_latest()` reads the newest one from here
+  event_versions  one row per version of an event, keyed by the index id
+                  (`run_reindex.event_id`: day, band, venue) and `valid_from`;
+                  a new row starts whenever the event's content hash changes,
+                  `valid_to` is set when it changes again or the event drops
+                  out of the snapshots, and stays NULL for the current version
+
+`run_scraper.py` records every snapshot it saves (with `--no-history` only
+in the catalog); the CLI catches up on snapshots written before the store
+existed. Snapshots must be ingested
+oldest first: one older than the newest ingested snapshot is catalogued, but
+its events are not applied.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from run_reindex import prepare_docs
+from snapshots import HISTORY_FILENAME, iter_snapshot, snapshot_files
+
+# columns copied out of the document for queries; the whole document is in `doc`
+TRACKED = ("date", "band", "location", "price_eur", "status_kind", "status_raw", "new_location")
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    name TEXT PRIMARY KEY,
+    basepath TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    applied INTEGER NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_latest ON snapshots (basepath, taken_at);
+CREATE TABLE IF NOT EXISTS event_versions (
+    event_id TEXT NOT NULL,
+    valid_from TEXT NOT NULL,
+    valid_to TEXT,
+    content_hash TEXT NOT NULL,
+    {", ".join(f"{c} {'REAL' if c == 'price_eur' else 'TEXT'}" for c in TRACKED)},
+    doc TEXT NOT NULL,
+    PRIMARY KEY (event_id, valid_from)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS event_versions_current ON event_versions (event_id) WHERE valid_to IS NULL;
+"""
+
+_TIMESTAMP = re.compile(r"_(\d{8}_\d{6})\.")
+
+
+def history_path(directory: str) -> str:
+    return os.path.join(directory, HISTORY_FILENAME)
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    # rollback journal, not WAL: the backend may read the file from another
+    # node over a shared volume, where WAL's shared memory index does not work
+    conn.execute("PRAGMA journal_mode=DELETE")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def snapshot_taken_at(path: str) -> str:
+    """UTC time a snapshot was taken: from its `_<YYYYmmdd_HHMMSS>` name, else its mtime."""
+    m = _TIMESTAMP.search(os.path.basename(path))
+    if m:
+        return datetime.strptime(m.group(1), "%Y%m%d_%H%M%S").isoformat()
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+def _basepath(path: str) -> str:
+    name = os.path.basename(path)
+    m = _TIMESTAMP.search(name)
+    return name[:m.start()] if m else name.split(".", 1)[0]
+
+
+def ingest(conn: sqlite3.Connection, path: str, events: Optional[Iterable] = None) -> Dict[str, Any]:
+    """Apply one snapshot to the history; `events` defaults to the file's content.
+
+    Returns counts of new, changed, gone and unchanged events, or
+    `{"skipped": reason}` if the snapshot was already ingested or is older
+    than the history.
+    """
+    name, basepath, taken_at = os.path.basename(path), _basepath(path), snapshot_taken_at(path)
+    if conn.execute("SELECT 1 FROM snapshots WHERE name = ?", (name,)).fetchone():
+        return {"skipped": "already ingested"}
+    newest = conn.execute("SELECT MAX(taken_at) FROM snapshots WHERE basepath = ? AND applied",
+                          (basepath,)).fetchone()[0]
+    stats = {"new": 0, "changed": 0, "gone": 0, "unchanged": 0}
+    count = 0
+    with conn:
+        if newest is not None and taken_at <= newest:
+            count = sum(1 for _ in (events if events is not None else iter_snapshot(path)))
+            conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, 0, ?)",
+                         (name, basepath, taken_at, count, _now()))
+            return {"skipped": f"older than the newest ingested snapshot ({newest})"}
+
+        current = dict(conn.execute("SELECT event_id, content_hash FROM event_versions WHERE valid_to IS NULL"))
+        seen = set()
+        for doc in prepare_docs(events if events is not None else iter_snapshot(path)):
+            count += 1
+            event_id, content_hash = doc["id"], doc["content_hash"]
+            seen.add(event_id)
+            previous = current.get(event_id)
+            if previous == content_hash:
+                stats["unchanged"] += 1
+                continue
+            if previous is None:
+                stats["new"] += 1
+            else:
+                stats["changed"] += 1
+                conn.execute("UPDATE event_versions SET valid_to = ? WHERE event_id = ? AND valid_to IS NULL",
+                             (taken_at, event_id))
+            conn.execute(
+                f"INSERT OR REPLACE INTO event_versions VALUES (?, ?, NULL, ?, {', '.join('?' * len(TRACKED))}, ?)",
+                (event_id, taken_at, content_hash, *(doc.get(c) for c in TRACKED),
+                 json.dumps(doc, ensure_ascii=False, sort_keys=True)),
+            )
+        gone = [(taken_at, event_id) for event_id in current if event_id not in seen]
+        conn.executemany("UPDATE event_versions SET valid_to = ? WHERE event_id = ? AND valid_to IS NULL", gone)
+        stats["gone"] = len(gone)
+        conn.execute("INSERT INTO snapshots VALUES (?, ?, ?, ?, 1, ?)", (name, basepath, taken_at, count, _now()))
+    return stats
+
+
+def catalog(conn: sqlite3.Connection, path: str, count: int) -> bool:
+    """Record a snapshot in the catalog only, without applying its events;
+    False if it is already there."""
+    with conn:
+        cur = conn.execute("INSERT OR IGNORE INTO snapshots VALUES (?, ?, ?, ?, 0, ?)",
+                           (os.path.basename(path), _basepath(path), snapshot_taken_at(path), count, _now()))
+    return cur.rowcount == 1
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+def compact(directory: str, basepath: str = "concert_events", db_path: Optional[str] = None) -> List[tuple]:
+    """Ingest every snapshot in `directory` that is not in the history yet,
+    oldest first; returns `(path, stats)` pairs."""
+    conn = connect(db_path or history_path(directory))
+    try:
+        known = {row[0] for row in conn.execute("SELECT name FROM snapshots")}
+        pending = [p for p in snapshot_files(directory, basepath) if os.path.basename(p) not in known]
+        pending.sort(key=snapshot_taken_at)
+        return [(path, ingest(conn, path)) for path in pending]
+    finally:
+        conn.close()
+
+
+def event_history(conn: sqlite3.Connection, event_id: str) -> List[Dict[str, Any]]:
+    """Versions of one event, oldest first."""
+    rows = conn.execute(
+        f"SELECT valid_from, valid_to, {', '.join(TRACKED)} FROM event_versions WHERE event_id = ? ORDER BY valid_from",
+        (event_id,),
+    )
+    return [dict(zip(("valid_from", "valid_to") + TRACKED, row)) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact scraper snapshots into the SQLite history store")
+    parser.add_argument("--path", default=os.getenv("SCRAPER_OUTPUT_DIR", "."), help="Snapshot directory")
+    parser.add_argument("--db", help=f"History database (default: <path>/{HISTORY_FILENAME})")
+    parser.add_argument("--basepath", default="concert_events", help="Snapshot file name prefix")
+    parser.add_argument("--event", help="Print the history of this event id instead of ingesting")
+    args = parser.parse_args()
+
+    db_path = args.db or history_path(args.path)
+    if args.event:
+        conn = connect(db_path)
+        versions = event_history(conn, args.event)
+        conn.close()
+        if not versions:
+            print(f"No history for {args.event}")
+            sys.exit(1)
+        for v in versions:
+            print(f"{v['valid_from']} .. {v['valid_to'] or 'now':<19}  {v['price_eur']!s:>7} €  "
+                  f"{v['status_kind'] or '':<12} {v['band']} @ {v['location']}")
+        return
+
+    results = compact(args.path, args.basepath, db_path)
+    for path, stats in results:
+        if "skipped" in stats:
+            print(f"{os.path.basename(path)}: skipped, {stats['skipped']}")
+        else:
+            print(f"{os.path.basename(path)}: {stats['new']} new, {stats['changed']} changed, "
+                  f"{stats['gone']} gone, {stats['unchanged']} unchanged")
+    print(f"Ingested {len(results)} snapshots into {db_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""HTML -> text line extraction without building a DOM.
+
+`iter_html_lines()` tokenizes HTML with the standard library `HTMLParser`
+(the same tokenizer BeautifulSoup's "html.parser" builder sits on) and yields
+text lines as soon as they are complete. Its output matches
+
+    soup = BeautifulSoup(html, "html.parser")
+    [ln.strip() for ln in soup.get_text("\\n", strip=True).splitlines() if ln.strip()]
+
+which is what `run_scraper.html_to_lines(..., backend="bs4")` returns:
+strings are split at every tag, comment and declaration; `<script>`,
+`<style>` and `<template>` contents, comments, doctypes and processing
+instructions are dropped; CDATA sections are kept as their own string.
+
+The optional "lxml" backend runs libxml2's HTML parser in target mode (also
+without a tree). It is faster still, but libxml2 repairs broken markup its own
+way, so compare it with `--html-backend bs4` on recorded pages before relying
+on it.
+"""
+import re
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List
+
+from bs4.dammit import EntitySubstitution, UnicodeDammit
+
+# elements whose text BeautifulSoup stores as Script/Stylesheet/TemplateString,
+# which get_text() leaves out
+SKIPPED_ELEMENTS = {"script", "style", "template"}
+
+_DECIMAL_REF = re.compile("^([0-9]+)(.*)")
+_HEX_REF = re.compile("^([0-9a-f]+)(.*)")
+
+
+def _lines(piece: str) -> List[str]:
+    piece = piece.strip()
+    if not piece:
+        return []
+    return [ln.strip() for ln in piece.splitlines() if ln.strip()]
+
+
+class _LineCollector(HTMLParser):
+    def __init__(self) -> None:
+        # references are resolved by the handlers below, exactly as
+        # BeautifulSoup's builder does it, so malformed ones come out the same
+        super().__init__(convert_charrefs=False)
+        self.lines: List[str] = []
+        self._text: List[str] = []
+        self._skip = 0
+
+    def _flush(self) -> None:
+        if self._text:
+            self.lines.extend(_lines("".join(self._text)))
+            self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIPPED_ELEMENTS:
+            self._skip += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIPPED_ELEMENTS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip:
+            self._text.append(data)
+
+    def handle_entityref(self, name):
+        char = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(char if char is not None else "&" + name)
+
+    def handle_charref(self, name):
+        base, pattern = 10, _DECIMAL_REF
+        if name[:1] in ("x", "X"):
+            name, base, pattern = name[1:], 16, _HEX_REF
+        m = pattern.match(name)
+        if m is None:
+            self.handle_data(name)
+            return
+        char, _ = UnicodeDammit.numeric_character_reference(int(m.group(1), base))
+        self.handle_data(char + m.group(2))
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA[") and not self._skip:
+            self.lines.extend(_lines(data[6:]))
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def iter_html_lines(chunks: Iterable[str]) -> Iterator[str]:
+    """Yield the non-empty, stripped text lines of an HTML document fed as
+    string chunks (e.g. `requests.Response.iter_content(decode_unicode=True)`)."""
+    parser = _LineCollector()
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.lines:
+            yield from parser.lines
+            parser.lines = []
+    parser.close()
+    yield from parser.lines
+
+
+def html_to_lines_stream(html: str) -> List[str]:
+    return list(iter_html_lines([html]))
+
+
+class _LxmlTarget:
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self._text: List[str] = []
+        self._skip = 0
+
+    def _flush(self) -> None:
+        if self._text:
+            self.lines.extend(_lines("".join(self._text)))
+            self._text = []
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag in SKIPPED_ELEMENTS:
+            self._skip += 1
+
+    def end(self, tag):
+        self._flush()
+        if tag in SKIPPED_ELEMENTS and self._skip:
+            self._skip -= 1
+
+    def data(self, data):
+        if not self._skip:
+            self._text.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        return self.lines
+
+
+def html_to_lines_lxml(html: str) -> List[str]:
+    from lxml import etree  # optional dependency
+
+    parser = etree.HTMLParser(target=_LxmlTarget())
+    return etree.fromstring(html, parser) if html.strip() else []
@@ -0,0 +1,100 @@
+"""On-disk cache for MusicBrainz band lookups.
+
+Results of `get_band_info()` are stored in a small SQLite file keyed by the
+normalized band name, including ambiguous and no-match answers (negative
+caching), so recurring bands do not hit MusicBrainz again until their entry
+expires. Keep the file on the scraper output volume to share it between
+CronJob runs.
+"""
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+DEFAULT_FILENAME = "musicbrainz_cache.sqlite"
+
+
+def normalize_band(name: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", name or "").casefold().split())
+
+
+class BandInfoCache:
+    """SQLite-backed cache of `{"members", "genres", "match"}` lookups.
+
+    `ttl_days` applies to found artists, `negative_ttl_days` to ambiguous and
+    no-match results, which are worth re-checking sooner. The connection is
+    shared between threads and guarded by a lock; entries are also kept in
+    memory, with the same expiry.
+    """
+
+    def __init__(self, path: str, ttl_days: float = 30, negative_ttl_days: float = 7) -> None:
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # decoded entries already read or written by this process, so a
+        # long-running scraper asks SQLite once per band
+        self._memo: Dict[str, tuple] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS band_info (
+                name TEXT PRIMARY KEY,
+                match TEXT NOT NULL,
+                members TEXT NOT NULL,
+                genres TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, band: str) -> Optional[dict]:
+        """Return the cached info, or None if missing or expired."""
+        key = normalize_band(band)
+        entry = self._memo.get(key)
+        if entry is None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT match, members, genres, fetched_at FROM band_info WHERE name = ?",
+                    (key,),
+                ).fetchone()
+            if row is not None:
+                match, members, genres, fetched_at = row
+                entry = ({"members": json.loads(members), "genres": json.loads(genres), "match": match}, fetched_at)
+                self._memo[key] = entry
+        if entry is not None:
+            info, fetched_at = entry
+            ttl = self.ttl if info["match"] == "found" else self.negative_ttl
+            if time.time() - fetched_at < ttl:
+                self.hits += 1
+                return info
+        self.misses += 1
+        return None
+
+    def put(self, band: str, info: dict) -> None:
+        key, fetched_at = normalize_band(band), time.time()
+        info = {"members": info.get("members") or [], "genres": info.get("genres") or [],
+                "match": info.get("match", "found")}
+        self._memo[key] = (info, fetched_at)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO band_info (name, match, members, genres, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    info["match"],
+                    json.dumps(info["members"], ensure_ascii=False),
+                    json.dumps(info["genres"], ensure_ascii=False),
+                    fetched_at,
+                ),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
-"""Index the latest concert_events_*.json directly into Meilisearch.
+"""Index the latest concert_events_* snapshot directly into Meilisearch.
 
-This script finds the most recent `concert_events_*.json` (or uses a provided
-file) and adds the documents to the Meilisearch `events` index using the
-`meilisearch` Python client.
+This script finds the most recent `concert_events_*.json`/`.ndjson(.gz)` (or
+uses a provided file) and adds the documents to the Meilisearch `events` index
+using the `meilisearch` Python client. NDJSON snapshots are streamed into the
+index batch by batch without loading the whole file.
 
 Usage examples:
   python reindex.py --path data/raw/underdog
@@ -11,73 +12,311 @@ Usage examples:
       --meili-url http://localhost:7700 --api-key "$MEILI_API_KEY"
 """
 import argparse
-import glob
+import hashlib
 import json
 import os
 import sys
+from datetime import datetime, timezone
 from pathlib import Path
-import uuid
 
 import meilisearch
+from meilisearch.errors import MeilisearchApiError
 
+from bulk_ingest import BulkIngester, ingest, sync_settings, wait_for_task
+from event_model import Event
+from scrape_state import STATE_FILENAME, ScrapeState
+from stage_metrics import StageTimer
+from snapshots import find_latest, iter_snapshot
 
-def find_latest(basepath="concert_events", directory="."):
-    pattern = os.path.join(directory, f"{basepath}_*.json")
-    files = glob.glob(pattern)
-    if not files:
-        return None
-    return max(files, key=os.path.getmtime)
 
+def event_id(doc):
+    """Deterministic id from (date, band, location/section).
 
-def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    The same gig keeps its id across snapshots, which is what lets the delta
+    mode upsert only what changed.
+    """
+    key = "|".join([
+        str(doc.get("date") or "")[:10],
+        " ".join(str(doc.get("band") or "").lower().split()),
+        " ".join(str(doc.get("location") or doc.get("section") or "").lower().split()),
+    ])
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
 
 
 def ensure_ids(docs):
     # Ensure each document has an 'id' field (Meilisearch primary key)
     for d in docs:
         if "id" not in d or d.get("id") in (None, ""):
-            d["id"] = str(uuid.uuid4())
+            d["id"] = event_id(d)
     return docs
 
+
+def add_content_hashes(docs):
+    # Hash of everything except the hash itself; used to detect changed documents
+    for d in docs:
+        body = {k: v for k, v in d.items() if k != "content_hash"}
+        d["content_hash"] = hashlib.sha1(
+            json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+    return docs
+
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def prepare_docs(docs):
+    """Lazily turn snapshot dicts into index documents with id, date fields
+    and content hash.
+
+    The same gig can be listed twice in a snapshot; only its first occurrence
+    is passed on, so every mode indexes the same document for it.
+    """
+    seen = set()
+    for d in docs:
+        event = Event.from_dict(d)
+        ensure_ids((event,))
+        if event.id in seen:
+            continue
+        seen.add(event.id)
+        add_date_fields((event,))
+        doc = event.to_dict()
+        add_content_hashes((doc,))
+        yield doc
+
+
+def add_date_fields(docs):
+    """Derive `day` (YYYY-MM-DD), `weekday` (mon..sun) and `date_ts` (epoch
+    seconds of midnight UTC) from each document's ISO `date`, so the backend
+    can filter and facet on them in Meilisearch instead of parsing dates per hit.
+    """
+    for d in docs:
+        try:
+            dt = datetime.fromisoformat(str(d.get("date"))[:10])
+        except ValueError:
+            continue
+        d["day"] = dt.date().isoformat()
+        d["weekday"] = WEEKDAYS[dt.weekday()]
+        d["date_ts"] = int(dt.replace(tzinfo=timezone.utc).timestamp())
+    return docs
+
+
+def check_snapshot(path):
+    """Read the whole snapshot once, keeping nothing but a count; raises
+    ValueError if it is unreadable or malformed.
+
+    Indexing streams the file again, so this runs first: otherwise a
+    truncated or corrupt snapshot would fail halfway, after full mode has
+    dropped the index.
+    """
+    try:
+        return sum(1 for _ in prepare_docs(iter_snapshot(path)))
+    except (OSError, EOFError, UnicodeDecodeError) as e:
+        raise ValueError(f"{path}: {e}") from None
+    except (TypeError, AttributeError, KeyError) as e:
+        raise ValueError(f"{path}: expected event objects ({e})") from None
+
+
 def drop_all(meili_url, api_key, index_name="events"):
     client = meilisearch.Client(meili_url, api_key)
+    # wait for the deletion, otherwise the settings diff would still see the old index
     try:
-        client.delete_index(index_name)
+        wait_for_task(client, client.delete_index(index_name).task_uid)
         print("Old index deleted.")
-    except Exception:
+    except (MeilisearchApiError, RuntimeError):
         print("Index did not exist, skipping delete.")
 
-def index_to_meili(events, meili_url, api_key, index_name="events", primary_key="id"):
+
+INDEX_SETTINGS = {
+    # common attributes used in the notebooks
+    "searchableAttributes": ["band", "location", "description", "venue"],
+    "filterableAttributes": ["location", "status_kind", "price_eur", "date", "band", "weekday", "date_ts", "day", "sources"],
+    "sortableAttributes": ["date", "date_ts", "price_eur"],
+    "faceting": {"maxValuesPerFacet": 1000},
+}
+
+
+def document_count(client, index_name):
+    # Number of documents in an index, or None if it does not exist
+    try:
+        return client.index(index_name).get_stats().number_of_documents
+    except MeilisearchApiError as e:
+        if e.code == "index_not_found":
+            return None
+        raise
+
+
+def rebuild_to_meili(events, meili_url, api_key, index_name="events", primary_key="id",
+                     max_shrink=0.5, dry_run=False, **ingest_opts):
+    """Zero-downtime full rebuild (blue/green).
+
+    Builds `<index>_<timestamp>` with settings applied before the documents,
+    waits for every task, swaps it with the live index and deletes the old
+    data. The swap is refused if the new index has fewer than
+    `(1 - max_shrink)` times the live document count; a refused or failed
+    build deletes the staging index. With `dry_run` only that check is run
+    against the snapshot and nothing is written.
+    """
     client = meilisearch.Client(meili_url, api_key)
-    index = client.index(index_name)
+    live_count = document_count(client, index_name)
+    min_count = int((live_count or 0) * (1 - max_shrink))
+    timeout = ingest_opts.get("task_timeout", 300.0)
 
-    # Add documents
-    resp = index.add_documents(events, primary_key=primary_key)
+    if dry_run:
+        new_count = len({d[primary_key] for d in events})
+        ok = new_count >= min_count
+        print(f"Dry run: snapshot has {new_count} documents, live index {live_count or 0} "
+              f"(minimum {min_count}) -> {'would swap' if ok else 'would refuse swap'}")
+        return {"dry_run": True, "documents": new_count, "live_documents": live_count, "ok": ok}
 
-    # Update common attributes used in the notebooks
+    staging = f"{index_name}_{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
+    print(f"Building '{staging}'")
     try:
-        index.update_searchable_attributes(["band", "location", "description", "venue"])  # example
-        index.update_filterable_attributes(["location", "status_kind", "price_eur", "date", "band"])
-        index.update_sortable_attributes(["date", "price_eur"])
-        index.update_faceting_settings({"maxValuesPerFacet": 1000})  # example
+        wait_for_task(client, client.create_index(staging, {"primaryKey": primary_key}).task_uid, timeout)
+        report = ingest(client, staging, events, settings=INDEX_SETTINGS, primary_key=primary_key, **ingest_opts)
+        print(f"Ingest: {report}")
+
+        new_count = document_count(client, staging)
+        if report.failures or new_count < min_count:
+            wait_for_task(client, client.delete_index(staging).task_uid, timeout)
+            print(f"Refusing to swap: '{staging}' has {new_count} documents, live index {live_count} "
+                  f"(minimum {min_count}), {len(report.failures)} failed batches; '{staging}' deleted")
+            return None
+
+        if live_count is None:
+            wait_for_task(client, client.create_index(index_name, {"primaryKey": primary_key}).task_uid, timeout)
+        wait_for_task(client, client.swap_indexes([{"indexes": [index_name, staging]}]).task_uid, timeout)
     except Exception:
-        # non-fatal if the server rejects attribute updates (older meili versions)
-        pass
+        # a failed build must not leave a staging index behind; a swap that
+        # still completes is queued before this delete, so it only removes
+        # the previous live data
+        drop_staging(client, staging, timeout)
+        raise
+    # after the swap the staging uid holds the previous live data
+    wait_for_task(client, client.delete_index(staging).task_uid, timeout)
+    print(f"Swapped '{staging}' into '{index_name}': {live_count or 0} -> {new_count} documents")
+    return {"documents": new_count, "live_documents": live_count, "ingest": report.as_dict()}
+
+
+def drop_staging(client, staging, timeout):
+    """Best-effort delete of a staging index after a failed rebuild."""
+    try:
+        wait_for_task(client, client.delete_index(staging).task_uid, timeout)
+        print(f"Rebuild failed, '{staging}' deleted")
+    except Exception as e:
+        print(f"Rebuild failed and '{staging}' could not be deleted: {e}")
+
+
+def index_to_meili(events, meili_url, api_key, index_name="events", primary_key="id", **ingest_opts):
+    client = meilisearch.Client(meili_url, api_key)
+    # settings first, so Meilisearch indexes the documents only once
+    return ingest(client, index_name, events, settings=INDEX_SETTINGS, primary_key=primary_key, **ingest_opts)
+
+
+def fetch_index_hashes(index, page_size=1000):
+    """Return {id: content_hash} for every document currently in the index."""
+    hashes = {}
+    offset = 0
+    while True:
+        try:
+            page = index.get_documents({"fields": ["id", "content_hash"], "limit": page_size, "offset": offset})
+        except MeilisearchApiError as e:
+            if e.code == "index_not_found":
+                return {}
+            raise
+        for doc in page.results:
+            hashes[doc.id] = getattr(doc, "content_hash", None)
+        offset += len(page.results)
+        if not page.results or offset >= page.total:
+            return hashes
+
+
+def delta_to_meili(events, meili_url, api_key, index_name="events", primary_key="id", existing=None,
+                   **ingest_opts):
+    """Upsert only added/changed documents and delete the ones that vanished.
+
+    The live index stays searchable throughout; work scales with the number of
+    changes instead of the catalogue size. `events` (with unique ids, see
+    `prepare_docs()`) may be a one-pass iterator: only ids and content hashes
+    are kept in memory. `existing` ({id: content_hash} of the index) skips
+    reading them from Meilisearch.
+    """
+    client = meilisearch.Client(meili_url, api_key)
+    index = client.index(index_name)
+
+    if existing is None:
+        existing = fetch_index_hashes(index)
+    seen = set()
+    counts = {"changed": 0, "unchanged": 0}
+
+    def changed_docs():
+        for d in events:
+            seen.add(d[primary_key])
+            if existing.get(d[primary_key]) == d["content_hash"]:
+                counts["unchanged"] += 1
+                continue
+            counts["changed"] += 1
+            yield d
+
+    updated = sync_settings(client, index, INDEX_SETTINGS, timeout=ingest_opts.get("task_timeout", 300.0))
+    if updated:
+        print(f"Updated settings: {', '.join(sorted(updated))}")
+    ingester = BulkIngester(client, index_name, primary_key=primary_key, **ingest_opts)
+    ingester.add(changed_docs())
+    vanished = [i for i in existing if i not in seen]
+    print(f"Delta: {counts['changed']} added/changed, {len(vanished)} vanished, "
+          f"{counts['unchanged']} unchanged")
+    ingester.delete(vanished)
+    return ingester.finish()
+
+
+class DeltaIndexer:
+    """Delta indexing for a long-running process such as `run_scraper.py --daemon`.
+
+    Takes events straight from the scraper instead of a snapshot file, and
+    remembers the content hashes it left the index with, so only the first
+    run (and the run after a failed one) pages through the index to read them.
+    """
 
-    return resp
+    def __init__(self, meili_url, api_key, index_name="events", **ingest_opts):
+        self.meili_url = meili_url
+        self.api_key = api_key
+        self.index_name = index_name
+        self.ingest_opts = ingest_opts
+        self.hashes = None
+
+    def index(self, events):
+        docs = list(prepare_docs(events))
+        hashes, self.hashes = self.hashes, None
+        report = delta_to_meili(docs, self.meili_url, self.api_key, index_name=self.index_name,
+                                existing=hashes, **self.ingest_opts)
+        if not report.failures:
+            self.hashes = {d["id"]: d["content_hash"] for d in docs}
+        return report
 
 
 def main():
     parser = argparse.ArgumentParser()
     group = parser.add_mutually_exclusive_group()
-    group.add_argument("--file", help="Path to a specific JSON file to index")
-    group.add_argument("--path", help="Directory to search for concert_events_*.json", default=".")
+    group.add_argument("--file", help="Path to a specific snapshot file (.json, .ndjson, .ndjson.gz) to index")
+    group.add_argument("--path", help="Directory to search for concert_events_* snapshots", default=".")
 
     parser.add_argument("--meili-url", help="Meilisearch URL", default=os.getenv("MEILI_URL", "http://localhost:7700"))
     parser.add_argument("--api-key", help="Meilisearch API key", default=os.getenv("MEILI_API_KEY", None))
     parser.add_argument("--index", help="Meilisearch index name", default="events")
+    parser.add_argument("--mode", choices=["full", "delta", "rebuild"], default="full",
+                        help="full: drop and re-upload everything; delta: upsert changed and delete vanished documents; "
+                             "rebuild: build a new index and swap it in without downtime")
+    parser.add_argument("--max-shrink", type=float, default=0.5,
+                        help="rebuild: refuse the swap if the new index lost more than this fraction of documents")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="rebuild: only run the document-count sanity check, write nothing")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Documents per add_documents batch")
+    parser.add_argument("--max-in-flight", type=int, default=4, help="Maximum number of enqueued, unfinished batches")
+    parser.add_argument("--metrics-file", default=os.getenv("REINDEX_METRICS_FILE"),
+                        help="Write stage timings here after the run (.prom: Prometheus text, else JSON)")
+    parser.add_argument("--task-timeout", type=float, default=300.0, help="Seconds to wait for each Meilisearch task")
+    parser.add_argument("--skip-indexed", action="store_true",
+                        help="Do nothing if the scrape state records this snapshot as already indexed")
     args = parser.parse_args()
 
     # print("Arguments:", args)
@@ -101,28 +340,71 @@ def main():
                 latest = find_latest(directory=os.path.dirname(candidate) or ".", basepath=Path(candidate).stem)
 
     if not latest:
-        print("No concert_events_*.json files found.")
+        print("No concert_events_* snapshot files found.")
         sys.exit(2)
 
     print(f"Found file: {latest}")
-    events = load_json(latest)
-    if not isinstance(events, list):
-        print("Expected JSON file to contain a list of event objects.")
+    # the scraper's state file next to the snapshot remembers what was indexed
+    state_path = os.path.join(os.path.dirname(latest) or ".", STATE_FILENAME)
+    state = ScrapeState(state_path) if os.path.exists(state_path) else None
+    if args.skip_indexed and state is not None and state.indexed_snapshot(args.index) == os.path.basename(latest):
+        print(f"{os.path.basename(latest)} is already indexed, nothing to do")
+        return
+    try:
+        print(f"Loaded {check_snapshot(latest)} events")
+    except ValueError as e:
+        print(f"Cannot read snapshot: {e}")
         sys.exit(2)
-
-    print(f"Loaded {len(events)} events")
-    events = ensure_ids(events)
+    events = prepare_docs(iter_snapshot(latest))
 
     meili_url = args.meili_url
     api_key = args.api_key
     if api_key is None:
         print("Warning: no MEILI API key provided; attempting unauthenticated connection")
 
-    print(f"Drop all")
-    drop_all(meili_url, api_key)
-    print(f"Indexing into Meilisearch at {meili_url} -> index '{args.index}'")
-    res = index_to_meili(events, meili_url, api_key, index_name=args.index, primary_key="id")
-    print("Meilisearch response:", res)
+    ingest_opts = {
+        "batch_size": args.batch_size,
+        "max_in_flight": args.max_in_flight,
+        "task_timeout": args.task_timeout,
+    }
+
+    with StageTimer("reindex").run(args.metrics_file) as timer:
+        with timer.stage("index", mode=args.mode) as stage:
+            if args.mode == "delta":
+                print(f"Delta indexing into Meilisearch at {meili_url} -> index '{args.index}'")
+                res = delta_to_meili(events, meili_url, api_key, index_name=args.index, primary_key="id", **ingest_opts)
+            elif args.mode == "rebuild":
+                print(f"Rebuilding Meilisearch index '{args.index}' at {meili_url}")
+                res = rebuild_to_meili(events, meili_url, api_key, index_name=args.index, primary_key="id",
+                                       max_shrink=args.max_shrink, dry_run=args.dry_run, **ingest_opts)
+                if res is None:
+                    sys.exit(1)
+                print("Meilisearch response:", res)
+                if isinstance(res.get("ingest"), dict):
+                    stage.items = res["ingest"]["documents"]
+                if not args.dry_run:
+                    record_indexed(state, latest, args.index)
+                return
+            else:
+                print(f"Drop all")
+                drop_all(meili_url, api_key, index_name=args.index)
+                print(f"Indexing into Meilisearch at {meili_url} -> index '{args.index}'")
+                res = index_to_meili(events, meili_url, api_key, index_name=args.index, primary_key="id", **ingest_opts)
+        stage.items = res.documents
+        print(f"Ingest: {res}")
+        if res.failures:
+            for failure in res.failures:
+                print(f"  failed batch {failure['batch']}: {failure['error']}")
+            sys.exit(1)
+        record_indexed(state, latest, args.index)
+
+
+def record_indexed(state, snapshot, index_name):
+    """Note a successful reindex in the scrape state, so `entrypoint.sh` can
+    tell an unchanged page whose last reindex failed (`--skip-indexed`)."""
+    if state is not None:
+        state.record_indexed(snapshot, index_name)
+        state.commit()
 
 
 if __name__ == "__main__":
@@ -8,12 +8,26 @@ import musicbrainzngs
 import time
 import logging
 from musicbrainzngs.musicbrainz import NetworkError
-import json
 import os
 from typing import Optional
 import argparse
+import functools
+import sys
 from datetime import datetime
 
+import history
+from daemon import Daemon
+from enrich import Enricher
+from event_model import Event
+from html_lines import html_to_lines_lxml, html_to_lines_stream
+from mb_cache import DEFAULT_FILENAME as MB_CACHE_FILENAME, BandInfoCache
+from run_reindex import DeltaIndexer
+from scrape_state import STATE_FILENAME, ScrapeState
+from snapshots import FORMATS as SNAPSHOT_FORMATS, SnapshotWriter, iter_events, prune_snapshots
+from snapshots import find_latest as find_latest_snapshot
+from sources import SOURCES, Source, get_sources, merge_events, register, run_sources
+from stage_metrics import StageTimer
+
 # set a stable user agent once at import time
 musicbrainzngs.set_useragent("UnderdogEventsParser", "1.0")
 
@@ -21,13 +35,20 @@ logger = logging.getLogger(__name__)
 
 URL = "https://underdogrecordstore.de/vorverkauf"
 
-def _retry_call(func, *args, retries: int = 3, base_delay: float = 0.5, **kwargs):
+# exit status telling entrypoint.sh that nothing changed and reindexing can be skipped
+EXIT_UNCHANGED = 3
+
+def _retry_call(func, *args, retries: int = 3, base_delay: float = 0.5, limiter=None, deadline=None, **kwargs):
     """Helper to call a musicbrainzngs function with retries on NetworkError.
 
     Returns the function result on success, or ``None`` if all retries failed due
-    to network errors.
+    to network errors. With a ``limiter`` (``enrich.TokenBucket``) every attempt
+    first takes a token; ``deadline`` (``time.monotonic()`` value) gives up
+    instead of waiting or backing off past it.
     """
     for attempt in range(1, retries + 1):
+        if limiter is not None and not limiter.acquire(deadline):
+            return None
         try:
             return func(*args, **kwargs)
         except NetworkError as e:
@@ -37,29 +58,37 @@ def _retry_call(func, *args, retries: int = 3, base_delay: float = 0.5, **kwargs
                 return None
             # exponential backoff
             sleep_for = base_delay * (2 ** (attempt - 1))
+            if deadline is not None and time.monotonic() + sleep_for > deadline:
+                return None
             time.sleep(sleep_for)
 
 
-def get_band_info(name: str, max_genres=3):
+def get_band_info(name: str, max_genres=3, limiter=None, deadline=None):
     """Fetch band members and genres from MusicBrainz by artist name.
 
     This function will retry network failures up to 3 times and will gracefully
     skip (return empty lists) if MusicBrainz cannot be reached. It will also
     attempt safer include sets if the server rejects the `genres` include.
+
+    The returned `match` tells how the lookup ended: "found", "ambiguous"
+    (several artists), "none" (no artist) or "error" (MusicBrainz unreachable).
+    Only "error" results are not worth caching.
     """
 
     # Step 1: Search for artist (with retries on network errors)
-    result = _retry_call(musicbrainzngs.search_artists, artist=name)
-    if not result or not result.get("artist-list"):
-        return {"members": [], "genres": []}
+    result = _retry_call(musicbrainzngs.search_artists, artist=name, limiter=limiter, deadline=deadline)
+    if result is None:
+        return {"members": [], "genres": [], "match": "error"}
+    if not result.get("artist-list"):
+        return {"members": [], "genres": [], "match": "none"}
 
     # Pick the best match
     count = len(result["artist-list"])
 
-    print(f"MusicBrainz search for '{result["artist-list"]}' returned {count} artists")
+    logger.debug("MusicBrainz search for %r returned %d artists", name, count)
 
     if count > 1:
-        return {"members": [], "genres": []}
+        return {"members": [], "genres": [], "match": "ambiguous"}
 
     artist = result["artist-list"][0]
     mbid = artist["id"]
@@ -70,15 +99,16 @@ def get_band_info(name: str, max_genres=3):
     artist_data = None
 
     try:
-        data = _retry_call(musicbrainzngs.get_artist_by_id, mbid, includes=["artist-rels", "tags"])
+        data = _retry_call(musicbrainzngs.get_artist_by_id, mbid, includes=["artist-rels", "tags"],
+                           limiter=limiter, deadline=deadline)
         artist_data = data.get("artist")
         
     except Exception as e:
         logger.warning("Unexpected error fetching artist %s: %s", name, e)
-        return {"members": [], "genres": []}
+        return {"members": [], "genres": [], "match": "error"}
 
     if not artist_data:
-        return {"members": [], "genres": []}
+        return {"members": [], "genres": [], "match": "error"}
 
     # Extract members
     members = []
@@ -96,12 +126,53 @@ def get_band_info(name: str, max_genres=3):
     genres = [t["name"] for t in tags[:max_genres]]
     # genres = [t.get("name") for t in artist_data.get("tag-list", []) if t.get("name")]
 
-    return {"members": members, "genres": genres}
+    return {"members": members, "genres": genres, "match": "found"}
 
-def get_lines_from_page(url: str) -> List[str]:
-    r = requests.get(url, timeout=20)
+
+def get_lines_from_page(url: str, state: Optional[ScrapeState] = None, backend: Optional[str] = None,
+                        session=None) -> Optional[List[str]]:
+    """Download `url` and return its non-empty text lines.
+
+    With a `state`, the request is conditional (ETag / Last-Modified) and
+    ``None`` is returned when the server answers 304 Not Modified. A
+    `requests.Session` reuses its pooled connection.
+    """
+    headers = state.request_headers(url) if state is not None else {}
+    r = (session or requests).get(url, timeout=20, headers=headers)
+    if r.status_code == 304:
+        return None
     r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
+    if state is not None:
+        state.record_response(url, r.headers)
+    return html_to_lines(r.text, backend=backend)
+
+
+HTML_BACKENDS = ("stream", "lxml", "bs4")
+DEFAULT_HTML_BACKEND = os.getenv("SCRAPER_HTML_BACKEND", "stream")
+
+
+def html_to_lines(html: str, backend: Optional[str] = None) -> List[str]:
+    """Non-empty, stripped text lines of `html`.
+
+    "stream" (default) tokenizes without building a tree and gives the same
+    lines as "bs4", the original BeautifulSoup path, which is also used when
+    another backend fails. "lxml" needs the optional lxml package.
+    """
+    backend = backend or DEFAULT_HTML_BACKEND
+    if backend != "bs4":
+        try:
+            if backend == "stream":
+                return html_to_lines_stream(html)
+            if backend == "lxml":
+                return html_to_lines_lxml(html)
+            raise ValueError(f"unknown HTML backend {backend!r}, expected one of {HTML_BACKENDS}")
+        except Exception as e:
+            logger.warning("HTML backend %s failed (%s), falling back to bs4", backend, e)
+    return html_to_lines_bs4(html)
+
+
+def html_to_lines_bs4(html: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
     text = soup.get_text("\n", strip=True)
     return [ln.strip() for ln in text.splitlines() if ln.strip()]
 
@@ -139,6 +210,10 @@ def build_event_pattern():
     )
 
 
+# compiled once per process, not per parse
+EVENT_RE = build_event_pattern()
+
+
 # status helpers
 ARTICLES = r"(?:die|den|das|dem|der)\s+"
 PREPS = r"(?:in|nach|vom|von)\s+"
@@ -148,31 +223,81 @@ STATUS_PATTERNS = [
     (re.compile(r"\babgesagt!?$", re.I), "abgesagt"),
     (re.compile(r"\bverlegt\b.*", re.I), "verlegt"),
 ]
+# cheap pre-check: most lines carry no status at all, so one scan rules out
+# every STATUS_PATTERNS entry at once
+STATUS_HINT = re.compile(r"ausverkauft|abgesagt|verlegt", re.I)
+VERLEGT_PREFIX = re.compile(r"^[Vv]erlegt")
+FALLBACK_LOC = re.compile(r"(?:in|nach|vom|von\s+(?:die|den|das|dem|der))?\s*(?P<loc>[^,(]+)", re.I)
+
 
+class LocationMatcher:
+    """Finds the known location mentioned in a text in a single regex pass.
+
+    Equivalent to trying ``\\b<loc>\\b`` (case-insensitive) for every location,
+    longest first, and taking the first hit, but compiled once per scrape so the
+    cost per line does not grow with the number of locations. The alternation
+    sits in a lookahead so overlapping candidates are all seen.
+    """
 
-def parse_status(line: str, known_locs: List[str]) -> Tuple[str, str, str]:
+    def __init__(self, locations: List[str]) -> None:
+        self.locations = sorted(dict.fromkeys(loc for loc in locations if loc), key=len, reverse=True)
+        self._rank = {}
+        for i, loc in enumerate(self.locations):
+            self._rank.setdefault(loc.lower(), i)
+        alternation = "|".join(re.escape(loc) for loc in self.locations)
+        self._re = re.compile(rf"(?=\b({alternation})\b)", re.I) if self.locations else None
+
+    def _rank_of(self, text: str) -> int:
+        rank = self._rank.get(text.lower())
+        if rank is None:
+            # case folding corner cases the dict lookup does not cover
+            rank = next(i for i, loc in enumerate(self.locations) if re.fullmatch(re.escape(loc), text, re.I))
+        return rank
+
+    def find(self, text: str) -> str:
+        if self._re is None:
+            return ""
+        best = None
+        for m in self._re.finditer(text):
+            rank = self._rank_of(m.group(1))
+            if best is None or rank < best:
+                best = rank
+        return self.locations[best] if best is not None else ""
+
+
+@functools.lru_cache(maxsize=8)
+def location_matcher(locations: Tuple[str, ...]) -> LocationMatcher:
+    """`LocationMatcher` for a page's headings, reused while they stay the same."""
+    return LocationMatcher(list(locations))
+
+
+def parse_status(line: str, known_locs) -> Tuple[str, str, str]:
+    """Return (status_kind, new_location, status_raw) for an event line.
+
+    `known_locs` is a `LocationMatcher`, or a list of location names (a
+    matcher is then built for this call only).
+    """
     status_kind, new_location, status_raw = "", "", ""
 
-    for pat, kind in STATUS_PATTERNS:
-        m = pat.search(line)
-        if not m:
-            continue
-        status_kind = kind
-        status_raw = m.group(0).strip()
-        break
+    if STATUS_HINT.search(line):
+        for pat, kind in STATUS_PATTERNS:
+            m = pat.search(line)
+            if not m:
+                continue
+            status_kind = kind
+            status_raw = m.group(0).strip()
+            break
 
     # If status is 'verlegt' (moved), try to extract the new location from the status text
     if status_kind == "verlegt":
-        status_raw = re.sub(r"^[Vv]erlegt", "verlegt", status_raw)
+        status_raw = VERLEGT_PREFIX.sub("verlegt", status_raw)
         s = status_raw
         # always start "verlegt" in lowercase
         # remove leading "verlegt" and any following preposition/article
-        for loc in sorted(known_locs, key=len, reverse=True):
-            if re.search(rf"\b{re.escape(loc)}\b", s, flags=re.I):
-                new_location = loc
-                break
+        matcher = known_locs if isinstance(known_locs, LocationMatcher) else LocationMatcher(known_locs)
+        new_location = matcher.find(s)
         if not new_location:
-            mm = re.search(r"(?:in|nach|vom|von\s+(?:die|den|das|dem|der))?\s*(?P<loc>[^,(]+)", s, re.I)
+            mm = FALLBACK_LOC.search(s)
             if mm:
                 new_location = mm.group("loc").strip()
 
@@ -184,12 +309,139 @@ def parse_status(line: str, known_locs: List[str]) -> Tuple[str, str, str]:
 
 
 
-def fetch_events() -> List[dict]:
-    lines = get_lines_from_page(URL)
-    known_locations = fetch_locations_from_headings(lines)
-    event_re = build_event_pattern()
+@register
+class UnderdogSource(Source):
+    """The Underdog record store presale page."""
+
+    name = "underdog"
+    url = URL
+
+    def fetch(self, state: Optional[ScrapeState] = None) -> Optional[List[str]]:
+        lines = get_lines_from_page(self.url, state=state, backend=self.html_backend, session=self.session)
+        if lines is None or (state is not None and not state.lines_changed(self.url, lines)):
+            return None
+        return lines
+
+    def parse(self, raw: List[str], now: datetime) -> List[Event]:
+        return parse_lines(raw, now=now)
+
+
+# snapshots written before sources existed only contain Underdog events
+DEFAULT_SOURCE = UnderdogSource.name
+
+
+def fetch_events(
+    enricher: Optional[Enricher] = None,
+    state: Optional[ScrapeState] = None,
+    html_backend: Optional[str] = None,
+) -> Optional[List[Event]]:
+    """Scrape and parse the Underdog presale page.
 
+    With an `enricher`, members and genres are looked up on MusicBrainz in a
+    separate stage after parsing; without one they stay empty. With a
+    `state`, ``None`` is returned when the page (or its line list) is
+    unchanged since the last recorded run.
+    """
+    events = UnderdogSource(html_backend=html_backend).scrape(state=state)
+
+    if events is not None and enricher is not None:
+        enricher.run(events)
+    return events
+
+
+def scrape_sources(sources: List[Source], state: Optional[ScrapeState] = None,
+                   previous: Optional[List[Event]] = None,
+                   timer: Optional[StageTimer] = None) -> Optional[List[Event]]:
+    """Scrape `sources` concurrently and merge their events.
+
+    Returns ``None`` when no source changed since the last run. Otherwise the
+    events of sources that were unchanged or failed are carried over from
+    `previous` (the last snapshot), so neither an unchanged page is fetched
+    again nor does one broken site drop its gigs from the index. Only an
+    unchanged source with nothing to carry over (e.g. its snapshot is gone)
+    is refetched unconditionally. Raises RuntimeError if every source
+    failed. Per-source fetch/parse times go to `timer`.
+    """
     now = datetime.now()
+    results = run_sources(sources, state=state, now=now)
+    for r in results:
+        print(f"Source {r}")
+    _record_timings(timer, results)
+    if all(r.error for r in results):
+        raise RuntimeError("all sources failed")
+    if not any(r.events is not None for r in results):
+        return None
+
+    carried = {}
+    for e in previous or []:
+        carried.setdefault(e.get("source", DEFAULT_SOURCE), []).append(e)
+    missing = [s for s, r in zip(sources, results) if r.unchanged and s.name not in carried]
+    if missing:
+        refetched = {r.name: r for r in run_sources(missing, now=now)}
+        _record_timings(timer, refetched.values(), prefix="refetch_")
+        results = [refetched.get(r.name, r) for r in results]
+
+    per_source = []
+    for r in results:
+        if r.events is not None:
+            per_source.append(r.events)
+        else:
+            events = carried.get(r.name, [])
+            print(f"Source {r.name}: keeping {len(events)} events from the last snapshot")
+            per_source.append(events)
+    return merge_events(per_source)
+
+
+def _record_timings(timer: Optional[StageTimer], results, prefix: str = "") -> None:
+    if timer is None:
+        return
+    for r in results:
+        if "fetch" in r.timings:
+            timer.record(prefix + "fetch", r.timings["fetch"], source=r.name)
+        if "parse" in r.timings:
+            timer.record(prefix + "parse", r.timings["parse"], items=len(r.events or []), source=r.name)
+
+
+def infer_event_date(date: str, now: datetime) -> datetime:
+    """Resolve a year-less `DD.MM.` date relative to `now`."""
+    d = datetime.strptime(date + str(now.year), "%d.%m.%Y")
+
+    tmp_date = date
+    tmp_date = tmp_date.strip()
+    if tmp_date.endswith("."):
+        tmp_date = tmp_date[:-1]
+
+    e_day, e_month = map(int, tmp_date.split("."))
+    n_day, n_month = now.day, now.month
+
+    if (e_month, e_day) < (n_month, n_day):
+        # more than 3 month in the past
+        if (now - d).days > 90:
+            # future
+            if e_month > n_month or (e_month == n_month and e_day >= n_day):
+                # increasing month, this year
+                pass
+            else:
+                # smaller month, assume next year
+                d = d.replace(year=now.year + 1)
+        else:
+            # past
+            if e_month > n_month:
+                d = d.replace(year=now.year - 1)
+            else:
+                pass
+    else:
+        pass
+    return d
+
+
+def parse_lines(lines: List[str], now: Optional[datetime] = None) -> List[Event]:
+    """Parse the text lines of a presale page into events, sorted by date."""
+    known_locations = fetch_locations_from_headings(lines)
+    loc_matcher = location_matcher(tuple(known_locations))
+    event_re = EVENT_RE
+
+    now = now or datetime.now()
     events = []
     section = None
 
@@ -214,40 +466,13 @@ def fetch_events() -> List[dict]:
 
         location = at_loc if at_loc else (section or "")
 
-        d = datetime.strptime(date + str(now.year), "%d.%m.%Y")
-
-        tmp_date = date
-        tmp_date = tmp_date.strip()
-        if tmp_date.endswith("."):
-            tmp_date = tmp_date[:-1]
-
-        e_day, e_month = map(int, tmp_date.split("."))
-        n_day, n_month = now.day, now.month
-
-        if (e_month, e_day) < (n_month, n_day):
-            # more than 3 month in the past
-            if (now - d).days > 90:
-                # future
-                if e_month > n_month or (e_month == n_month and e_day >= n_day):
-                    # increasing month, this year
-                    pass
-                else:
-                    # smaller month, assume next year
-                    d = d.replace(year=now.year + 1)
-            else:
-                # past
-                if e_month > n_month:
-                    d = d.replace(year=now.year - 1)
-                else:
-                    pass
-        else:
-            pass
+        d = infer_event_date(date, now)
 
         # print(f"Parsed DATE: {date} -> converted to: {d.date()}")
 
         price_eur = float(price_raw.replace(",", ".")) if price_raw else None
 
-        status_kind, new_location, status_raw = parse_status(line, known_locations)
+        status_kind, new_location, status_raw = parse_status(line, loc_matcher)
 
         # info = get_band_info(band)
 
@@ -260,34 +485,34 @@ def fetch_events() -> List[dict]:
         #       f"{'(members: ' + ', '.join(info['members']) + ')' if info['members'] else ''} "
         #       f"{'(genres: ' + ', '.join(info['genres']) + ')' if info['genres'] else ''}")
 
-        # set empty members and genres
-        info = { "members": [], "genres": [] }
-
-        events.append({
-            "origin": line,
-            "date": d,
-            "band": band,
-            "location": location,
-            "price_eur": price_eur,
-            "status_kind": status_kind,
-            "new_location": new_location,
-            "status_raw": status_raw,
-            "section": section,
-            "members": info["members"],
-            "genres": info["genres"]
-        })
-
-    events.sort(key=lambda x: x["date"])
+        # members and genres stay empty, filled in by the enrichment stage
+        events.append(Event(
+            origin=line,
+            date=d,
+            band=band,
+            location=location,
+            price_eur=price_eur,
+            status_kind=status_kind,
+            new_location=new_location,
+            status_raw=status_raw,
+            section=section,
+            members=(),
+            genres=(),
+        ))
+
+    events.sort(key=lambda x: x.date)
     return events
 
-def save_events(events, basepath: str = "concert_events", path: Optional[str] = None) -> str:
-    """Save events to a timestamped JSON file.
+def save_events(events, basepath: str = "concert_events", path: Optional[str] = None, fmt: str = "json") -> str:
+    """Save events to a timestamped snapshot file.
 
     - basepath: base filename used when `path` is a directory or not provided.
-    - path: optional. If a file path is provided (endswith .json) it will be used
-      directly. If a directory path is provided, the file will be created inside
-      that directory using the basepath + timestamp. If omitted, file is created
-      in current working directory.
+    - path: optional. If a file path is provided (ending in .json, .ndjson or
+      .ndjson.gz) it will be used directly. If a directory path is provided,
+      the file will be created inside that directory using the basepath +
+      timestamp. If omitted, file is created in current working directory.
+    - fmt: "json", "ndjson" or "ndjson.gz" (see `snapshots.py`); events are
+      written one by one, so `events` may be any iterable.
 
     Returns the full path to the written file.
     """
@@ -297,46 +522,244 @@ def save_events(events, basepath: str = "concert_events", path: Optional[str] =
         # If user passed a directory, create file inside it
         if os.path.isdir(path) or path.endswith(os.path.sep):
             os.makedirs(path, exist_ok=True)
-            filename = os.path.join(path, f"{basepath}_{ts}.json")
+            filename = os.path.join(path, f"{basepath}_{ts}.{fmt}")
         else:
             # treat path as a file path; ensure parent dir exists
             parent = os.path.dirname(path)
             if parent:
                 os.makedirs(parent, exist_ok=True)
-            # if path has no .json extension, append timestamp
-            if not path.lower().endswith('.json'):
-                filename = f"{path}_{ts}.json"
+            # if path has no snapshot extension, append timestamp
+            if not path.lower().endswith(tuple("." + f for f in SNAPSHOT_FORMATS)):
+                filename = f"{path}_{ts}.{fmt}"
             else:
                 filename = path
     else:
-        filename = f"{basepath}_{ts}.json"
+        filename = f"{basepath}_{ts}.{fmt}"
 
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(events, f, ensure_ascii=False, indent=2)
-    print(f"Saved {len(events)} events to {filename}")
+    with SnapshotWriter(filename) as writer:
+        writer.write_all(events)
+    print(f"Saved {writer.count} events to {filename}")
     return filename
 
-def isoify(events):
-    out = []
-    for e in events:
-        ee = dict(e)
-        if isinstance(ee.get("date"), (datetime,)):
-            ee["date"] = ee["date"].isoformat()
-        out.append(ee)
-    return out
+def output_dir(path: Optional[str]) -> str:
+    """Directory `save_events()` writes into for the given `--path` value."""
+    if not path:
+        return "."
+    if os.path.isdir(path) or path.endswith(os.path.sep):
+        return path
+    return os.path.dirname(path) or "."
+
+def load_previous_events(directory: str, basepath: str = "concert_events",
+                         db_path: Optional[str] = None) -> List[Event]:
+    latest = find_latest_snapshot(basepath=basepath, directory=directory, db_path=db_path)
+    return list(iter_events(latest)) if latest else []
+
+def record_history(filename: str, events, db_path: Optional[str] = None, catalog_only: bool = False) -> int:
+    """Add a saved snapshot to the history store next to it; returns the
+    number of new or changed events. `catalog_only` (`--no-history`) records
+    just the file, so `find_latest_snapshot()` still finds it."""
+    conn = history.connect(db_path or history.history_path(os.path.dirname(filename) or "."))
+    try:
+        if catalog_only:
+            history.catalog(conn, filename, len(events))
+            return 0
+        stats = history.ingest(conn, filename, events)
+    finally:
+        conn.close()
+    if "skipped" in stats:
+        print(f"History: snapshot skipped, {stats['skipped']}")
+        return 0
+    print(f"History: {stats['new']} new, {stats['changed']} changed, {stats['gone']} gone")
+    return stats["new"] + stats["changed"]
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--path", help="Directory to save the output JSON file", default=os.getenv("SCRAPER_OUTPUT_DIR") or os.getenv("SCRAPER_OUTPUT_PATH"))
+    parser.add_argument("--enrich", action="store_true", default=os.getenv("SCRAPER_ENRICH", "").lower() in ("1", "true", "yes"),
+                        help="Look up band members/genres on MusicBrainz (cached)")
+    parser.add_argument("--mb-cache", help="MusicBrainz cache file (default: <path>/" + MB_CACHE_FILENAME + ")",
+                        default=os.getenv("SCRAPER_MB_CACHE"))
+    parser.add_argument("--mb-cache-ttl-days", type=float, default=float(os.getenv("SCRAPER_MB_CACHE_TTL_DAYS", "30")),
+                        help="Days before a found artist is looked up again")
+    parser.add_argument("--mb-cache-negative-ttl-days", type=float, default=float(os.getenv("SCRAPER_MB_CACHE_NEGATIVE_TTL_DAYS", "7")),
+                        help="Days before an ambiguous/unknown band is looked up again")
+    parser.add_argument("--mb-workers", type=int, default=int(os.getenv("SCRAPER_MB_WORKERS", "4")),
+                        help="Concurrent MusicBrainz lookups")
+    parser.add_argument("--mb-rate", type=float, default=float(os.getenv("SCRAPER_MB_RATE", "1.0")),
+                        help="MusicBrainz requests per second, shared by all workers")
+    parser.add_argument("--mb-host", default=os.getenv("SCRAPER_MB_HOST"),
+                        help="MusicBrainz host[:port] over plain http, e.g. a local stub")
+    parser.add_argument("--enrich-budget", type=float, default=float(os.getenv("SCRAPER_ENRICH_BUDGET", "600")),
+                        help="Seconds the enrichment stage may take; remaining bands are skipped")
+    parser.add_argument("--force", action="store_true",
+                        help="Scrape and save even if the page did not change since the last run")
+    parser.add_argument("--format", choices=SNAPSHOT_FORMATS, default=os.getenv("SCRAPER_SNAPSHOT_FORMAT", "json"),
+                        help="Snapshot file format; ndjson(.gz) is written and read one event at a time")
+    parser.add_argument("--keep-snapshots", type=int, default=int(os.getenv("SCRAPER_KEEP_SNAPSHOTS", "0")),
+                        help="Delete all but this many newest snapshots after saving (0 keeps all)")
+    parser.add_argument("--sources", type=lambda v: [n.strip() for n in v.split(",") if n.strip()],
+                        default=os.getenv("SCRAPER_SOURCES", DEFAULT_SOURCE),
+                        help=f"Comma-separated sources to scrape (available: {', '.join(sorted(SOURCES))})")
+    parser.add_argument("--source-timeout", type=float, default=float(os.getenv("SCRAPER_SOURCE_TIMEOUT", "120")),
+                        help="Seconds each source may take before it counts as failed")
+    parser.add_argument("--metrics-file", default=os.getenv("SCRAPER_METRICS_FILE"),
+                        help="Write per-stage timings here after the run (.prom: Prometheus text, else JSON)")
+    parser.add_argument("--html-backend", choices=HTML_BACKENDS, default=DEFAULT_HTML_BACKEND,
+                        help="HTML to text lines extraction; bs4 is the original (slowest) path")
+    parser.add_argument("--history-db", default=os.getenv("SCRAPER_HISTORY_DB"),
+                        help=f"Event history store the new snapshot is added to (default: <path>/{history.HISTORY_FILENAME})")
+    parser.add_argument("--no-history", action="store_true",
+                        default=os.getenv("SCRAPER_HISTORY", "").lower() in ("0", "false", "no"),
+                        help="Only catalog the snapshot in the history store, do not record its events")
+    parser.add_argument("--daemon", action="store_true",
+                        default=os.getenv("SCRAPER_DAEMON", "").lower() in ("1", "true", "yes"),
+                        help="Keep running: scrape, save and index every --interval seconds")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("SCRAPER_INTERVAL", "3600")),
+                        help="Daemon: seconds between runs")
+    parser.add_argument("--jitter", type=float, default=float(os.getenv("SCRAPER_JITTER", "300")),
+                        help="Daemon: up to this many random seconds added to each interval")
+    parser.add_argument("--health-port", type=int, default=int(os.getenv("SCRAPER_HEALTH_PORT", "8080")),
+                        help="Daemon: port of the /healthz and /metrics endpoint (0 disables it)")
+    parser.add_argument("--meili-url", default=os.getenv("MEILI_URL"),
+                        help="Daemon: Meilisearch to delta-index each new snapshot into (unset: no indexing)")
+    parser.add_argument("--api-key", default=os.getenv("MEILI_API_KEY"), help="Daemon: Meilisearch API key")
+    parser.add_argument("--index", default="events", help="Daemon: Meilisearch index name")
     args = parser.parse_args()
+    # the daemon keeps its connections to the source sites open between runs
+    session = requests.Session() if args.daemon else None
+    try:
+        sources = get_sources(args.sources, timeout=args.source_timeout, html_backend=args.html_backend,
+                              session=session)
+    except ValueError as e:
+        parser.error(str(e))
+
+    state = None if args.force else ScrapeState(os.path.join(output_dir(args.path), STATE_FILENAME))
+
+    band_cache = None
+    enricher = None
+    if args.enrich:
+        cache_path = args.mb_cache or os.path.join(output_dir(args.path), MB_CACHE_FILENAME)
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        band_cache = BandInfoCache(cache_path, ttl_days=args.mb_cache_ttl_days,
+                                   negative_ttl_days=args.mb_cache_negative_ttl_days)
+        if args.mb_host:
+            musicbrainzngs.set_hostname(args.mb_host, use_https=False)
+        # the shared token bucket does the rate limiting; musicbrainzngs' own
+        # limiter would serialize every request behind one lock
+        musicbrainzngs.set_rate_limit(False)
+        enricher = Enricher(get_band_info, cache=band_cache, workers=args.mb_workers,
+                            rate=args.mb_rate, time_budget=args.enrich_budget)
+
+    if args.daemon:
+        try:
+            run_daemon(args, sources, state, enricher)
+        finally:
+            session.close()
+            if band_cache is not None:
+                band_cache.close()
+        return
+
+    with StageTimer("scraper").run(args.metrics_file, unchanged_code=EXIT_UNCHANGED) as timer:
+        run(args, sources, state, enricher, band_cache, timer)
 
-    events = fetch_events()
-    events = isoify(events)
 
-    if args.path:
-        save_events(events, basepath="concert_events", path=args.path)
+def run(args, sources, state, enricher, band_cache, timer: StageTimer) -> None:
+    try:
+        with timer.stage("load_previous") as stage:
+            previous = load_previous_events(output_dir(args.path), db_path=args.history_db)
+            stage.items = len(previous)
+        events = scrape_sources(sources, state=state, previous=previous, timer=timer)
+        if events is not None and enricher is not None:
+            with timer.stage("enrich") as stage:
+                enricher.run(events)
+                stage.items = enricher.stats.get("bands")
+    finally:
+        if band_cache is not None:
+            print(f"MusicBrainz enrichment: {enricher.stats}")
+            band_cache.close()
+    if events is None:
+        # still store refreshed validators so the next run can get a 304
+        state.commit()
+        print("Events unchanged since last run, no snapshot written.")
+        sys.exit(EXIT_UNCHANGED)
+
+    save_snapshot(args, events, timer)
+    if state is not None:
+        state.commit()
+
+
+def save_snapshot(args, events: List[Event], timer: StageTimer) -> str:
+    """Write the snapshot, add it to the history store and prune old ones."""
+    with timer.stage("save") as stage:
+        if args.path:
+            filename = save_events(events, basepath="concert_events", path=args.path, fmt=args.format)
+        else:
+            filename = save_events(events, basepath="concert_events", fmt=args.format)
+        stage.items = len(events)
+    with timer.stage("history") as stage:
+        stage.items = record_history(filename, events, args.history_db, catalog_only=args.no_history)
+    for removed in prune_snapshots(output_dir(args.path), args.keep_snapshots):
+        print(f"Removed old snapshot {removed}")
+    return filename
+
+
+def run_daemon(args, sources, state, enricher) -> None:
+    """`--daemon`: scrape, save and index on a schedule in one process.
+
+    Between runs the process keeps the sources' HTTP session, the compiled
+    patterns, the last events (carried over for failed sources instead of
+    re-reading the snapshot), the enrichment cache, and the content hashes of
+    the Meilisearch index. New events go to the indexer directly; the
+    snapshot is still written for the history and for restarts.
+    """
+    indexer = None
+    if args.meili_url:
+        indexer = DeltaIndexer(args.meili_url, args.api_key, index_name=args.index)
     else:
-        save_events(events, basepath="concert_events")
+        print("No --meili-url/MEILI_URL set, snapshots will not be indexed")
+    previous = load_previous_events(output_dir(args.path), db_path=args.history_db)
+    # events saved but not yet indexed, e.g. Meilisearch was down
+    unindexed: Optional[List[Event]] = None
+
+    def cycle(timer: StageTimer) -> str:
+        nonlocal previous, unindexed
+        events = scrape_sources(sources, state=state, previous=previous, timer=timer)
+        if events is None:
+            if state is not None:
+                state.commit()
+            print("Events unchanged since last run, no snapshot written.")
+            if unindexed is not None:
+                index_events(unindexed, timer)
+            return "unchanged"
+        if enricher is not None:
+            with timer.stage("enrich") as stage:
+                enricher.run(events)
+                stage.items = enricher.stats.get("bands")
+            print(f"MusicBrainz enrichment: {enricher.stats}")
+        save_snapshot(args, events, timer)
+        if state is not None:
+            state.commit()
+        previous = unindexed = events
+        index_events(events, timer)
+        return "ok"
+
+    def index_events(events: List[Event], timer: StageTimer) -> None:
+        nonlocal unindexed
+        if indexer is None:
+            unindexed = None
+            return
+        with timer.stage("index", mode="delta") as stage:
+            report = indexer.index(events)
+            stage.items = report.documents
+        print(f"Ingest: {report}")
+        if report.failures:
+            raise RuntimeError(f"{len(report.failures)} batches failed to index")
+        unindexed = None
+
+    daemon = Daemon(cycle, interval=args.interval, jitter=args.jitter, metrics_file=args.metrics_file)
+    if args.health_port:
+        daemon.serve_health(args.health_port)
+    daemon.run_forever()
 
 if __name__ == "__main__":
     main()
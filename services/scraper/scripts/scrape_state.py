@@ -0,0 +1,75 @@
+"""Change detection state kept next to the snapshots.
+
+For every scraped URL the state file stores the HTTP validators of the last
+response (ETag / Last-Modified) and a hash of the normalized line list. A run
+sends the validators as conditional request headers; when the server answers
+304, or the page changed only in ways that do not affect the extracted lines,
+the scrape is reported as unchanged and no snapshot or reindex is needed.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+STATE_FILENAME = "scrape_state.json"
+# not a URL: the snapshot the last successful reindex loaded (run_reindex.py)
+INDEXED_KEY = "_indexed"
+
+
+def lines_hash(lines: List[str]) -> str:
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+class ScrapeState:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._state: Dict[str, dict] = {}
+        self._pending: Dict[str, dict] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        """Conditional request headers for `url` from the last stored response."""
+        entry = self._state.get(url, {})
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record_response(self, url: str, headers) -> None:
+        self._pending.setdefault(url, {}).update({
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        })
+
+    def lines_changed(self, url: str, lines: List[str]) -> bool:
+        digest = lines_hash(lines)
+        self._pending.setdefault(url, {})["content_hash"] = digest
+        return self._state.get(url, {}).get("content_hash") != digest
+
+    def indexed_snapshot(self, index: str) -> Optional[str]:
+        """File name of the snapshot last indexed into `index` successfully."""
+        entry = self._state.get(INDEXED_KEY, {})
+        return entry.get("snapshot") if entry.get("index") == index else None
+
+    def record_indexed(self, snapshot: str, index: str) -> None:
+        self._pending[INDEXED_KEY] = {"snapshot": os.path.basename(snapshot), "index": index}
+
+    def discard(self, url: str) -> None:
+        """Forget what this run recorded for `url` (e.g. its parsing failed)."""
+        self._pending.pop(url, None)
+
+    def commit(self) -> None:
+        """Persist what was recorded in this run; call only after the snapshot
+        was written (or the run found nothing new), so a failed run is retried
+        in full next time."""
+        for url, entry in self._pending.items():
+            self._state.setdefault(url, {}).update(entry)
+        self._pending.clear()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp, self.path)
@@ -0,0 +1,185 @@
+"""Snapshot files of scraped events.
+
+Three formats share the `concert_events_<timestamp>` naming:
+
+  .json       one pretty-printed JSON array (the original format)
+  .ndjson     one JSON object per line
+  .ndjson.gz  the same, gzip-compressed
+
+NDJSON snapshots are written one event at a time and read back one event at a
+time, so neither the scraper nor the reindexer has to hold a whole snapshot
+as a single string or document. `.json` files stay readable, but are loaded
+in full.
+"""
+import glob
+import gzip
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Any, Iterable, Iterator, List, Optional
+
+from event_model import Event
+
+FORMATS = ("json", "ndjson", "ndjson.gz")
+# the history store (`history.py`); its `snapshots` table catalogs every saved snapshot
+HISTORY_FILENAME = "history.sqlite"
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def snapshot_format(path: str) -> str:
+    for fmt in ("ndjson.gz", "ndjson", "json"):
+        if path.endswith("." + fmt):
+            return fmt
+    raise ValueError(f"not a snapshot file: {path}")
+
+
+def _open(path: str, mode: str, fmt: str):
+    if fmt == "ndjson.gz":
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class SnapshotWriter:
+    """Write events to `path` as they come; the file only appears under its
+    final name once `close()` succeeds, so readers never see half a snapshot."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.format = snapshot_format(path)
+        self.count = 0
+        self._tmp = path + ".tmp"
+        self._f = _open(self._tmp, "w", self.format)
+        if self.format == "json":
+            self._f.write("[")
+
+    def write(self, event) -> None:
+        """Append an `Event` or a plain event dict."""
+        if self.format == "json":
+            if isinstance(event, Event):
+                event = event.to_dict()
+            self._f.write(",\n  " if self.count else "\n  ")
+            text = json.dumps(event, ensure_ascii=False, indent=2, default=_default)
+            self._f.write(text.replace("\n", "\n  "))
+        elif isinstance(event, Event):
+            self._f.write(event.to_json())
+            self._f.write("\n")
+        else:
+            self._f.write(json.dumps(event, ensure_ascii=False, default=_default))
+            self._f.write("\n")
+        self.count += 1
+
+    def write_all(self, events: Iterable) -> int:
+        for e in events:
+            self.write(e)
+        return self.count
+
+    def close(self) -> None:
+        if self.format == "json":
+            self._f.write("\n]" if self.count else "]")
+        self._f.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self) -> None:
+        self._f.close()
+        os.remove(self._tmp)
+
+    def __enter__(self) -> "SnapshotWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def iter_snapshot(path: str) -> Iterator[dict]:
+    """Yield the events of a snapshot file of any format."""
+    fmt = snapshot_format(path)
+    if fmt == "json":
+        with open(path, "r", encoding="utf-8") as f:
+            events = json.load(f)
+        if not isinstance(events, list):
+            raise ValueError(f"{path}: expected a JSON list of event objects")
+        yield from events
+        return
+    with _open(path, "r", fmt) as f:
+        for n, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{n}: {e}") from None
+
+
+def iter_events(path: str) -> Iterator[Event]:
+    """Like `iter_snapshot()`, but yields `Event` records."""
+    for d in iter_snapshot(path):
+        yield Event.from_dict(d)
+
+
+def _snapshot_paths(directory: str, basepath: str) -> List[str]:
+    files = []
+    for fmt in FORMATS:
+        files.extend(glob.glob(os.path.join(directory, f"{basepath}_*.{fmt}")))
+    return files
+
+
+def snapshot_files(directory: str = ".", basepath: str = "concert_events") -> List[str]:
+    """Snapshot files in `directory`, oldest first."""
+    return sorted(_snapshot_paths(directory, basepath), key=os.path.getmtime)
+
+
+def catalogued_latest(db_path: str, directory: str, basepath: str = "concert_events") -> Optional[str]:
+    """Newest snapshot of `directory` in the history store's catalog that
+    still exists, or None if the store cannot be read or has none."""
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    except sqlite3.Error:
+        return None
+    try:
+        rows = conn.execute("SELECT name FROM snapshots WHERE basepath = ? ORDER BY taken_at DESC",
+                            (basepath,))
+        for (name,) in rows:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                return path
+    except sqlite3.Error:
+        return None
+    finally:
+        conn.close()
+    return None
+
+
+def find_latest(basepath: str = "concert_events", directory: str = ".",
+                db_path: Optional[str] = None) -> Optional[str]:
+    """Newest snapshot in `directory`.
+
+    Read from the history store's catalog (`db_path`, default
+    `<directory>/history.sqlite`), which `run_scraper.py` writes for every
+    snapshot it saves, with or without `--no-history`. Only without a store,
+    or with nothing catalogued, are the snapshot files globbed.
+    """
+    db_path = db_path or os.path.join(directory, HISTORY_FILENAME)
+    if os.path.exists(db_path):
+        latest = catalogued_latest(db_path, directory, basepath)
+        if latest is not None:
+            return latest
+    files = _snapshot_paths(directory, basepath)
+    return max(files, key=os.path.getmtime) if files else None
+
+
+def prune_snapshots(directory: str, keep: int, basepath: str = "concert_events") -> List[str]:
+    """Delete all but the newest `keep` snapshots; returns the removed paths."""
+    if keep <= 0:
+        return []
+    removed = snapshot_files(directory, basepath)[:-keep]
+    for path in removed:
+        os.remove(path)
+    return removed
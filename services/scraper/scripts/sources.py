@@ -0,0 +1,182 @@
+"""Event source plugins and the concurrent multi-source runner.
+
+A `Source` turns one listing site into event dicts shaped like those from
+`run_scraper.parse_lines()`: `fetch()` downloads the page (lines or records,
+``None`` when it did not change since the last run) and `parse()` turns that
+into events. Sources register themselves by name with `@register`, and the
+scraper runs the ones selected with `--sources`.
+
+`run_sources()` scrapes all selected sources in parallel threads, so a run
+takes about as long as the slowest source. Every source has its own timeout;
+a source that fails or times out does not affect the others and is reported
+in its `SourceResult`. `merge_events()` then folds the same gig listed by
+several sources into one event.
+"""
+import logging
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+logger = logging.getLogger(__name__)
+
+SOURCES: Dict[str, Type["Source"]] = {}
+
+
+def register(cls: Type["Source"]) -> Type["Source"]:
+    """Class decorator adding a `Source` subclass to `SOURCES` under its name."""
+    SOURCES[cls.name] = cls
+    return cls
+
+
+def get_sources(names: Iterable[str], **opts) -> List["Source"]:
+    unknown = [n for n in names if n not in SOURCES]
+    if unknown:
+        raise ValueError(f"unknown source(s) {', '.join(unknown)}; available: {', '.join(sorted(SOURCES))}")
+    return [SOURCES[n](**opts) for n in names]
+
+
+class Source:
+    """Base class for an event listing site."""
+
+    name = ""
+    url = ""
+    timeout = 60.0
+
+    def __init__(self, timeout: Optional[float] = None, html_backend: Optional[str] = None,
+                 session=None) -> None:
+        if timeout is not None:
+            self.timeout = timeout
+        self.html_backend = html_backend
+        # a shared `requests.Session` keeps connections open between runs of
+        # the daemon; None uses a new connection per request
+        self.session = session
+        # seconds spent in fetch()/parse() by the last scrape()
+        self.timings: Dict[str, float] = {}
+
+    def fetch(self, state=None) -> Optional[Any]:
+        """Download the listing; ``None`` if `state` says it is unchanged."""
+        raise NotImplementedError
+
+    def parse(self, raw: Any, now: datetime) -> List[dict]:
+        raise NotImplementedError
+
+    def scrape(self, state=None, now: Optional[datetime] = None) -> Optional[List[dict]]:
+        self.timings = {}
+        started = time.perf_counter()
+        raw = self.fetch(state)
+        self.timings["fetch"] = time.perf_counter() - started
+        if raw is None:
+            return None
+        started = time.perf_counter()
+        events = self.parse(raw, now or datetime.now())
+        for e in events:
+            e["source"] = self.name
+        self.timings["parse"] = time.perf_counter() - started
+        return events
+
+
+class SourceResult:
+    def __init__(self, name: str, events: Optional[List[dict]] = None, error: Optional[str] = None,
+                 seconds: float = 0.0, timings: Optional[Dict[str, float]] = None) -> None:
+        self.name = name
+        self.events = events
+        self.error = error
+        self.seconds = seconds
+        self.timings = timings or {}
+
+    @property
+    def unchanged(self) -> bool:
+        return self.events is None and self.error is None
+
+    def __str__(self) -> str:
+        if self.error:
+            outcome = f"failed: {self.error}"
+        elif self.unchanged:
+            outcome = "unchanged"
+        else:
+            outcome = f"{len(self.events)} events"
+        return f"{self.name}: {outcome} ({self.seconds:.1f}s)"
+
+
+def run_sources(sources: List[Source], state=None, now: Optional[datetime] = None) -> List[SourceResult]:
+    """Scrape `sources` concurrently; results come back in the same order.
+
+    A source still running after its `timeout` is reported as failed and left
+    to finish in the background (its HTTP requests carry their own timeouts).
+    """
+    now = now or datetime.now()
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(max_workers=max(1, len(sources)), thread_name_prefix="source")
+    futures = [pool.submit(_scrape_one, s, state, now) for s in sources]
+    results = []
+    try:
+        for source, fut in zip(sources, futures):
+            remaining = max(0.0, started + source.timeout - time.monotonic())
+            try:
+                result = fut.result(timeout=remaining)
+            except TimeoutError:
+                result = SourceResult(source.name, error=f"timed out after {source.timeout:g}s",
+                                      seconds=time.monotonic() - started)
+            if result.error and state is not None:
+                # keep the last good validators/hash so the next run refetches it
+                state.discard(source.url)
+            results.append(result)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
+
+
+def _scrape_one(source: Source, state, now: datetime) -> SourceResult:
+    started = time.monotonic()
+    try:
+        events = source.scrape(state=state, now=now)
+    except Exception as e:
+        logger.warning("Source %s failed: %s", source.name, e, exc_info=True)
+        return SourceResult(source.name, error=str(e) or type(e).__name__, seconds=time.monotonic() - started,
+                            timings=source.timings)
+    return SourceResult(source.name, events, seconds=time.monotonic() - started, timings=source.timings)
+
+
+def _fold(text: Optional[str]) -> str:
+    """Case-, accent- and punctuation-insensitive form used to compare names."""
+    text = unicodedata.normalize("NFKD", str(text or "").casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^0-9a-z]+", " ", text.replace("ß", "ss")).strip()
+
+
+def gig_key(event: dict) -> tuple:
+    """(day, band, venue) identifying the same gig across sources."""
+    date = event.get("date")
+    day = date.date().isoformat() if isinstance(date, datetime) else str(date or "")[:10]
+    return day, _fold(event.get("band")), _fold(event.get("location") or event.get("section"))
+
+
+def merge_events(results: List[List[dict]]) -> List[dict]:
+    """Concatenate per-source event lists, folding the same gig listed by more
+    than one source into the event of the first source listing it.
+
+    Missing values (price, status, members/genres) of the kept event are
+    filled in from the others, and `sources` lists every source that had the
+    gig. Repeated lines within a single source are left alone.
+    """
+    merged: List[dict] = []
+    by_key: Dict[tuple, dict] = {}
+    for events in results:
+        for e in events:
+            e.setdefault("sources", [e.get("source")] if e.get("source") else [])
+            key = gig_key(e)
+            first = by_key.get(key)
+            if first is None or first.get("source") == e.get("source"):
+                by_key.setdefault(key, e)
+                merged.append(e)
+                continue
+            for field, value in e.items():
+                if first.get(field) in (None, "", [], ()) and value not in (None, "", [], ()):
+                    first[field] = value
+            if e.get("source") not in first["sources"]:
+                first["sources"].append(e.get("source"))
+    merged.sort(key=lambda x: gig_key(x)[0])
+    return merged
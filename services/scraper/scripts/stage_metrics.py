@@ -0,0 +1,142 @@
+"""Per-stage timing of a scraper or reindex run.
+
+    with StageTimer("scraper").run("/data/metrics/scraper.prom") as timer:
+        with timer.stage("parse", source="underdog") as s:
+            events = ...
+            s.items = len(events)
+
+At the end of the run `run()` writes a summary the CronJob can hand on: a
+`.prom` path gets the Prometheus text format (for node_exporter's textfile
+collector, or a Pushgateway via `curl --data-binary @file`), any other path a
+JSON document.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+class Stage:
+    def __init__(self, name: str, labels: Dict[str, str]) -> None:
+        self.name = name
+        self.labels = labels
+        self.seconds = 0.0
+        self.items: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        d = {"stage": self.name, **self.labels, "seconds": round(self.seconds, 4)}
+        if self.items is not None:
+            d["items"] = self.items
+            d["items_per_s"] = round(self.items / self.seconds, 1) if self.seconds else None
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+class StageTimer:
+    def __init__(self, job: str) -> None:
+        self.job = job
+        self.stages: List[Stage] = []
+        self.started = time.time()
+        self.ended: Optional[float] = None
+        self.status = "ok"
+
+    @contextmanager
+    def stage(self, name: str, **labels: str):
+        stage = Stage(name, labels)
+        started = time.perf_counter()
+        try:
+            yield stage
+        except BaseException as e:
+            stage.error = type(e).__name__
+            raise
+        finally:
+            stage.seconds = time.perf_counter() - started
+            self.stages.append(stage)
+
+    def record(self, name: str, seconds: float, items: Optional[int] = None, **labels: str) -> Stage:
+        """Add a stage timed elsewhere (e.g. in a worker thread)."""
+        stage = Stage(name, labels)
+        stage.seconds = seconds
+        stage.items = items
+        self.stages.append(stage)
+        return stage
+
+    def elapsed(self) -> float:
+        return (self.ended or time.time()) - self.started
+
+    def summary(self) -> dict:
+        return {
+            "job": self.job,
+            "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(timespec="seconds"),
+            "seconds": round(self.elapsed(), 4),
+            "status": self.status,
+            "stages": [s.as_dict() for s in self.stages],
+        }
+
+    def prometheus(self) -> str:
+        prefix = f"gigfusion_{self.job}"
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duration of each {self.job} stage in the last run",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        for s in self.stages:
+            lines.append(f"{prefix}_stage_seconds{_labels(s)} {s.seconds:.6f}")
+        lines += [
+            f"# HELP {prefix}_stage_items Items handled by each {self.job} stage in the last run",
+            f"# TYPE {prefix}_stage_items gauge",
+        ]
+        for s in self.stages:
+            if s.items is not None:
+                lines.append(f"{prefix}_stage_items{_labels(s)} {s.items}")
+        lines += [
+            f"# HELP {prefix}_last_run_seconds Duration of the last {self.job} run",
+            f"# TYPE {prefix}_last_run_seconds gauge",
+            f"{prefix}_last_run_seconds {self.elapsed():.6f}",
+            f"# HELP {prefix}_last_run_timestamp_seconds Start of the last {self.job} run",
+            f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+            f"{prefix}_last_run_timestamp_seconds {self.started:.0f}",
+            f"# HELP {prefix}_last_run_success Whether the last {self.job} run succeeded",
+            f"# TYPE {prefix}_last_run_success gauge",
+            f"{prefix}_last_run_success {0 if self.status == 'failed' else 1}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    @contextmanager
+    def run(self, path: Optional[str], unchanged_code: Optional[int] = None):
+        """Wrap a whole run: set `status` from how it ends and write the
+        summary to `path` even if it fails or calls sys.exit()."""
+        try:
+            yield self
+        except SystemExit as e:
+            if unchanged_code is not None and e.code == unchanged_code:
+                self.status = "unchanged"
+            elif e.code:
+                self.status = "failed"
+            raise
+        except BaseException:
+            self.status = "failed"
+            raise
+        finally:
+            self.write(path)
+
+    def write(self, path: Optional[str]) -> None:
+        """Atomically write the summary to `path` (no-op without a path); ends the run."""
+        if self.ended is None:
+            self.ended = time.time()
+        if not path:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        body = self.prometheus() if path.endswith(".prom") else json.dumps(self.summary(), indent=2) + "\n"
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+
+def _labels(stage: Stage) -> str:
+    labels = {"stage": stage.name, **stage.labels}
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"